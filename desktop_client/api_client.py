@@ -1,11 +1,79 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import uuid
 import requests
+from cache import BlobCache
 
 BASE_URL = "http://127.0.0.1:8000"
+CHUNK_SIZE = 1024 * 1024
+
+
+class MultipartFile:
+    """
+    Тіло multipart/form-data, яке requests читає шматками прямо з диска: пам'ять не залежить
+    від розміру файлу. Довжина відома наперед, тому запит іде з Content-Length, а не chunked.
+    sha256 файлу рахується з тих самих шматків, що йдуть у мережу, і дописується полем
+    digest_field ПІСЛЯ файлу: окремого проходу по диску немає, а хеш точно описує надіслане.
+    """
+
+    def __init__(self, fields, name, path, digest_field="sha256"):
+        self.boundary = uuid.uuid4().hex
+        self.digest_field = digest_field
+        self.sha256 = hashlib.sha256()
+        head = b"".join(self._field(k, v) for k, v in fields.items())
+        head += self._part_header(name, os.path.basename(path))
+        tail = f"\r\n--{self.boundary}--\r\n".encode()
+        # hex-дайджест завжди 64 символи - довжину поля знаємо ще до хешування
+        self.length = len(head) + os.path.getsize(path) + len(self._field(digest_field, "0" * 64)) + len(tail)
+        self.file = open(path, 'rb')
+        self.parts = [io.BytesIO(head), self.file, io.BytesIO(tail)]
+
+    def _field(self, name, value):
+        return self._part_header(name) + str(value).encode() + b"\r\n"
+
+    def _part_header(self, name, filename=None):
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            # UTF-8 як є; лапки - quoted-string з \, переносів у заголовку бути не може
+            escaped = filename.replace("\\", "\\\\").replace('"', '\\"').replace("\r", " ").replace("\n", " ")
+            disposition += f'; filename="{escaped}"\r\nContent-Type: application/octet-stream'
+        return f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n\r\n".encode()
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        out = b""
+        while self.parts and (size < 0 or len(out) < size):
+            part = self.parts[0]
+            chunk = part.read(-1 if size < 0 else size - len(out))
+            if chunk:
+                if part is self.file: self.sha256.update(chunk)
+                out += chunk
+                continue
+            self.parts.pop(0).close()
+            if part is self.file:
+                # Файл дочитано - тепер хеш відомий; після файлу стоїть CRLF, далі наше поле
+                field = self._field(self.digest_field, self.sha256.hexdigest())
+                self.parts.insert(0, io.BytesIO(b"\r\n" + field[:-2]))
+        return out
+
+    def close(self):
+        for part in self.parts: part.close()
+        self.parts = []
 
 
 class CloudAPI:
     def __init__(self):
         self.token = None
+        self.cache = BlobCache()
 
     def login(self, username, password):
         try:
@@ -32,31 +100,211 @@ class CloudAPI:
         except:
             return []
 
-    def upload_file(self, path):
+    def upload_file(self, path, remote_dir="/", storage_name=None):
+        """
+        Вивантажує файл одним проходом по диску: тіло йде потоком, а sha256 рахується з тих
+        самих шматків і надсилається полем після файлу - сервер звіряє його до підміни блоба.
+        storage_name - перезаписати саме цей файл (зокрема розшарений з правом write) замість пошуку за ім'ям.
+        """
         try:
-            files = {'file': open(path, 'rb')}
-            requests.post(f"{BASE_URL}/upload", files=files, headers=self.get_header())
+            data = {"path": remote_dir}
+            if storage_name: data["storage_name"] = storage_name
+            body = MultipartFile(data, "file", path)
+            try:
+                headers = {**self.get_header(), "Content-Type": body.content_type}
+                res = requests.post(f"{BASE_URL}/upload", data=body, headers=headers)
+            finally:
+                body.close()
+            return res.status_code == 200
         except:
-            pass
+            return False
+
+    def fetch_blob(self, storage_name, version=None, sha256=None):
+        """
+        Локальний шлях до вмісту файлу через кеш. Якщо версія або sha256 збігається - без мережі,
+        інакше умовний запит з ETag (304 = кеш актуальний). None при помилці.
+        """
+        path, entry = self.cache.get(storage_name)
+        if path and version is not None and entry["version"] == version:
+            return path
+        if path and sha256 and entry["sha256"] == sha256:
+            # Нова версія з тим самим вмістом (повторне вивантаження) - перекачувати нічого
+            return self.cache.revalidated(storage_name, version)
+
+        headers = self.get_header()
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        try:
+            with requests.get(f"{BASE_URL}/raw/{storage_name}", headers=headers, stream=True) as r:
+                if r.status_code == 304:
+                    return self.cache.revalidated(storage_name, version)
+                if r.status_code != 200:
+                    return None
+                return self.cache.put(storage_name, version, r.headers.get("ETag"), r.iter_content(CHUNK_SIZE))
+        except Exception as e:
+            print(f"Download error: {e}")
+            return None
+
+    def download_file(self, storage_name, dest, version=None, sha256=None):
+        """
+        Зберігає файл у dest. Актуальна копія з кешу просто копіюється, інакше потік
+        пишеться одразу на диск фіксованим буфером - без кешу, щоб великі файли його не вимивали.
+        """
+        path, entry = self.cache.get(storage_name)
+        if path and ((version is not None and entry["version"] == version) or (sha256 and entry["sha256"] == sha256)):
+            shutil.copyfile(path, dest)
+            return True
+        with requests.get(f"{BASE_URL}/raw/{storage_name}", headers=self.get_header(), stream=True) as r:
+            if r.status_code != 200: return False
+            with open(dest, "wb") as f:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+        return True
+
+    def download_archive(self, storage_names, dest):
+        """Кілька файлів одним ZIP, який сервер генерує потоком."""
+        params = [("names", n) for n in storage_names]
+        with requests.get(f"{BASE_URL}/archive", params=params, headers=self.get_header(), stream=True) as r:
+            if r.status_code != 200: return False
+            with open(dest, "wb") as f:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+        return True
+
+    def read_range(self, storage_name, offset, length):
+        """(байти, повний розмір файлу) для вікна [offset, offset + length)."""
+        headers = {**self.get_header(), "Range": f"bytes={offset}-{offset + length - 1}"}
+        r = requests.get(f"{BASE_URL}/raw/{storage_name}", headers=headers)
+        if r.status_code == 206:
+            return r.content, int(r.headers["Content-Range"].rsplit("/", 1)[1])
+        if r.status_code == 200:
+            return r.content[offset:offset + length], len(r.content)
+        if r.status_code == 416:
+            return b"", int(r.headers["Content-Range"].rsplit("/", 1)[1])
+        raise IOError(f"Code: {r.status_code}")
+
+    def update_range(self, storage_name, offset, length, data, version=None):
+        """Замінює [offset, offset + length) на data. Повертає (код, нова версія)."""
+        try:
+            params = {"offset": offset, "length": length}
+            if version is not None: params["version"] = version
+            headers = {**self.get_header(), "Content-Type": "application/octet-stream"}
+            res = requests.patch(f"{BASE_URL}/content/{storage_name}", params=params, data=data, headers=headers)
+            return res.status_code, (res.json().get("version") if res.status_code == 200 else None)
+        except Exception as e:
+            print(f"Update error: {e}")
+            return None, None
+
+    def stream_events(self, cursor=None):
+        """Генератор подій з SSE-потоку /events. Закінчується при обриві з'єднання."""
+        headers = self.get_header()
+        if cursor is not None:
+            headers["Last-Event-ID"] = str(cursor)
+        with requests.get(f"{BASE_URL}/events", headers=headers, stream=True, timeout=(5, 60)) as r:
+            if r.status_code != 200: return
+            event = {}
+            for line in r.iter_lines(decode_unicode=True):
+                if line.startswith("id:"):
+                    event["id"] = int(line[3:].strip())
+                elif line.startswith("event:"):
+                    event["kind"] = line[6:].strip()
+                elif line.startswith("data:"):
+                    event.update(json.loads(line[5:].strip()))
+                elif line.startswith(":"):
+                    yield {"kind": "ping"}  # heartbeat - дає потоку шанс перевірити зупинку
+                elif not line and event:
+                    yield event
+                    event = {}
+
+    def delete_file(self, storage_name):
+        """Власний файл іде в кошик, чужий - зникає зі списку (знімається право). Повертає код відповіді."""
+        try:
+            return requests.delete(f"{BASE_URL}/delete/{storage_name}", headers=self.get_header()).status_code
+        except Exception as e:
+            print(f"Delete error: {e}")
+            return None
 
-    def share_file(self, filename, target, level):
+    def delete_files(self, storage_names):
+        """Масове перенесення власних файлів у кошик. Повертає кількість перенесених або None."""
         try:
-            requests.post(f"{BASE_URL}/share", json={"filename": filename, "target_user": target, "level": level},
+            res = requests.post(f"{BASE_URL}/delete", json={"storage_names": storage_names}, headers=self.get_header())
+            return res.json()["count"] if res.status_code == 200 else None
+        except Exception as e:
+            print(f"Delete error: {e}")
+            return None
+
+    def list_trash(self):
+        """Весь вміст кошика (сервер віддає сторінками)."""
+        files, cursor = [], 0
+        try:
+            while cursor is not None:
+                page = requests.get(f"{BASE_URL}/trash", params={"cursor": cursor},
+                                    headers=self.get_header()).json()
+                files += page["files"]
+                cursor = page["next_cursor"]
+        except Exception as e:
+            print(f"Trash error: {e}")
+        return files
+
+    def restore_files(self, storage_names):
+        try:
+            res = requests.post(f"{BASE_URL}/trash/restore", json={"storage_names": storage_names},
+                                headers=self.get_header())
+            return res.status_code == 200
+        except:
+            return False
+
+    def purge_trash(self, storage_names=None):
+        """Остаточне видалення вибраних файлів або всього кошика (None)."""
+        try:
+            body = {"storage_names": storage_names} if storage_names is not None else None
+            return requests.post(f"{BASE_URL}/trash/purge", json=body, headers=self.get_header()).status_code == 200
+        except:
+            return False
+
+    def share_file(self, storage_name, target, level):
+        try:
+            requests.post(f"{BASE_URL}/share", json={"storage_name": storage_name, "target_user": target, "level": level},
                           headers=self.get_header())
             return True
         except:
             return False
 
-    def update_content(self, storage_name, new_text):
+    def create_link(self, storage_name, hours=24):
+        """Публічне посилання, що діє hours годин. Повертає повний URL або None."""
+        try:
+            res = requests.post(f"{BASE_URL}/links", json={"storage_name": storage_name, "hours": hours},
+                                headers=self.get_header())
+            if res.status_code == 200:
+                return BASE_URL + res.json()["url"]
+        except Exception as e:
+            print(f"Link error: {e}")
+        return None
+
+    def list_links(self, storage_name=None):
+        try:
+            params = {"storage_name": storage_name} if storage_name else {}
+            return requests.get(f"{BASE_URL}/links", params=params, headers=self.get_header()).json()
+        except:
+            return []
+
+    def revoke_link(self, link_id):
+        try:
+            return requests.delete(f"{BASE_URL}/links/{link_id}", headers=self.get_header()).status_code == 200
+        except:
+            return False
+
+    def update_content(self, storage_name, new_text, version=None):
         try:
             url = f"{BASE_URL}/update_content"
             # Формуємо JSON для відправки
             data = {
                 "storage_name": storage_name,
-                "content": new_text
+                "content": new_text,
+                "version": version
             }
             res = requests.post(url, json=data, headers=self.get_header())
-            return res.status_code == 200
+            return res.status_code
         except Exception as e:
             print(f"Update error: {e}")
-            return False
\ No newline at end of file
+            return None
\ No newline at end of file
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_DIR = os.getenv("CLOUDDRIVE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "clouddrive"))
+DEFAULT_MAX_BYTES = int(os.getenv("CLOUDDRIVE_CACHE_MB", "512")) * 1024 * 1024
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BlobCache:
+    """
+    Локальний LRU-кеш блобів. Ключ - storage_name, разом із записом зберігаються
+    версія файлу та ETag сервера для умовних запитів (If-None-Match).
+    sha256 рахується один раз, під час запису; читання лише звіряє розмір і mtime -
+    змінений або пошкоджений на диску запис викидається без повторного хешування.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.dir = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.index_path = os.path.join(self.dir, "index.json")
+        os.makedirs(self.dir, exist_ok=True)
+        self.entries = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                # Порядок у файлі = порядок LRU (від найстарішого)
+                return OrderedDict((e["storage_name"], e) for e in json.load(f))
+        except (OSError, ValueError, KeyError):
+            return OrderedDict()
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(self.entries.values()), f)
+        os.replace(tmp, self.index_path)
+
+    def _blob(self, storage_name):
+        return os.path.join(self.dir, hashlib.sha1(storage_name.encode("utf-8")).hexdigest())
+
+    def _drop(self, storage_name):
+        self.entries.pop(storage_name, None)
+        try:
+            os.remove(self._blob(storage_name))
+        except OSError:
+            pass
+
+    @property
+    def total_bytes(self):
+        return sum(e["size"] for e in self.entries.values())
+
+    def get(self, storage_name):
+        """Повертає (шлях, запис) для цілого запису або (None, None)."""
+        with self.lock:
+            entry = self.entries.get(storage_name)
+            if not entry: return None, None
+            path = self._blob(storage_name)
+            if not self._verify(path, entry):
+                self._drop(storage_name)
+                self._save_index()
+                return None, None
+            self.entries.move_to_end(storage_name)
+            return path, entry
+
+    def _verify(self, path, entry):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != entry["size"]: return False
+        if "mtime_ns" not in entry:
+            # Запис зі старого індексу - один раз перевіряємо хеш і запам'ятовуємо mtime
+            if sha256_file(path) != entry["sha256"]: return False
+            entry["mtime_ns"] = st.st_mtime_ns
+            self._save_index()
+        return st.st_mtime_ns == entry["mtime_ns"]
+
+    def revalidated(self, storage_name, version):
+        """Сервер відповів 304 - запис актуальний, оновлюємо версію."""
+        with self.lock:
+            entry = self.entries.get(storage_name)
+            if not entry: return None
+            entry["version"] = version
+            self.entries.move_to_end(storage_name)
+            self._save_index()
+            return self._blob(storage_name)
+
+    def put(self, storage_name, version, etag, chunks):
+        """Пише потік чанків у кеш (через тимчасовий файл) і повертає шлях. sha256 - з того ж проходу."""
+        path = self._blob(storage_name)
+        tmp = path + ".part"
+        h = hashlib.sha256()
+        size = 0
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                h.update(chunk)
+                size += len(chunk)
+        with self.lock:
+            os.replace(tmp, path)
+            self.entries.pop(storage_name, None)
+            self.entries[storage_name] = {"storage_name": storage_name, "version": version, "etag": etag,
+                                          "size": size, "sha256": h.hexdigest(),
+                                          "mtime_ns": os.stat(path).st_mtime_ns}
+            self._evict(keep=storage_name)
+            self._save_index()
+        return path
+
+    def _evict(self, keep):
+        total = self.total_bytes
+        for name in list(self.entries):
+            if total <= self.max_bytes: break
+            if name == keep: continue
+            total -= self.entries[name]["size"]
+            self._drop(name)
+
+    def invalidate(self, storage_name):
+        with self.lock:
+            self._drop(storage_name)
+            self._save_index()
@@ -0,0 +1,70 @@
+from difflib import SequenceMatcher
+
+WINDOW_SIZE = 256 * 1024            # скільки байт тягнемо за один Range-запит
+
+
+def cut_page(data, at_eof):
+    """
+    Обрізає вікно по останньому переносу рядка, щоб сторінка не рвала рядок
+    (і UTF-8 символ). Повертає довжину сторінки в байтах.
+    """
+    if at_eof: return len(data)
+    nl = data.rfind(b"\n")
+    return nl + 1 if nl >= 0 else len(data)
+
+
+def decode_page(data):
+    """(текст, чи можна редагувати). Битий UTF-8 показуємо із заміною, але не даємо зберегти."""
+    try:
+        return data.decode("utf-8"), True
+    except UnicodeDecodeError:
+        return data.decode("utf-8", errors="replace"), False
+
+
+def changed_region(old, new):
+    """
+    Мінімальний змінений фрагмент: (зсув, скільки старих байт замінити, нові байти).
+    None, якщо змін немає.
+    """
+    if old == new: return None
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old[len(old) - 1 - end] == new[len(new) - 1 - end]:
+        end += 1
+    return start, len(old) - start - end, new[start:len(new) - end]
+
+
+def _split_lines(text):
+    """Рядки без переносів і перенос кожного ('\r\n', '\n'; в останнього - '')."""
+    lines, endings = [], []
+    for piece in text.split("\n"):
+        if piece.endswith("\r"):
+            lines.append(piece[:-1]); endings.append("\r\n")
+        else:
+            lines.append(piece); endings.append("\n")
+    endings[-1] = ""
+    return lines, endings
+
+
+def restore_line_endings(original, edited):
+    """
+    Редактор віддає рядки тільки через \n. Незмінені рядки отримують свої рідні переноси,
+    змінені - перенос рядка, який вони замінили, вставлені - сусіда зверху
+    (або переважний на сторінці). Файли зі змішаними переносами так не псуються.
+    """
+    old_lines, old_endings = _split_lines(original)
+    new_lines = edited.split("\n")
+    crlf = old_endings.count("\r\n")
+    default = "\r\n" if crlf > len(old_endings) - 1 - crlf else "\n"
+
+    endings = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes():
+        for k in range(j2 - j1):
+            if i1 + k < i2: endings.append(old_endings[i1 + k])
+            else: endings.append(endings[-1] if endings else default)
+    # Останній рядок сторінки без переносу; якщо після нього дописали рядки - йому потрібен перенос
+    endings = [e or default for e in endings[:-1]] + [""]
+    return "".join(line + end for line, end in zip(new_lines, endings))
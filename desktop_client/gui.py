@@ -1,13 +1,66 @@
 import os
 import tempfile
 import shutil
-from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QTableWidget, QTableWidgetItem, QPushButton,
                              QLabel, QFileDialog, QComboBox, QCheckBox,
-                             QInputDialog, QHeaderView, QSplitter, QTextEdit, QMessageBox, QAbstractItemView)
+                             QInputDialog, QHeaderView, QSplitter, QTextEdit, QMessageBox, QAbstractItemView,
+                             QDialog, QListWidget, QListWidgetItem)
 from PyQt6.QtGui import QColor, QBrush, QPixmap, QDragEnterEvent, QDropEvent, QDrag
-from PyQt6.QtCore import Qt, QUrl, QMimeData
-from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkRequest
+from PyQt6.QtCore import Qt, QUrl, QMimeData, QThread, QTimer, QItemSelectionModel
+
+
+class TrashDialog(QDialog):
+    """Кошик: відновлення або остаточне видалення вибраних файлів."""
+
+    def __init__(self, api, parent=None):
+        super().__init__(parent)
+        self.api = api
+        self.setWindowTitle("Trash")
+        self.resize(500, 400)
+
+        self.list = QListWidget()
+        self.list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        btn_restore = QPushButton("↩ Restore")
+        btn_restore.clicked.connect(self.restore)
+        btn_purge = QPushButton("✖ Delete Forever")
+        btn_purge.clicked.connect(self.purge)
+        btn_empty = QPushButton("Empty Trash")
+        btn_empty.clicked.connect(self.empty)
+
+        buttons = QHBoxLayout()
+        for b in (btn_restore, btn_purge, btn_empty): buttons.addWidget(b)
+        layout = QVBoxLayout()
+        layout.addWidget(self.list)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+        self.load()
+
+    def load(self):
+        self.list.clear()
+        for f in self.api.list_trash():
+            item = QListWidgetItem(f"{f.get('path', '/')}{f['filename']}    ({f['deleted_at']})")
+            item.setData(Qt.ItemDataRole.UserRole, f['storage_name'])
+            self.list.addItem(item)
+
+    def selected(self):
+        return [i.data(Qt.ItemDataRole.UserRole) for i in self.list.selectedItems()]
+
+    def restore(self):
+        names = self.selected()
+        if names and self.api.restore_files(names): self.load()
+
+    def purge(self):
+        names = self.selected()
+        if not names: return
+        ans = QMessageBox.question(self, "Confirm", f"Delete {len(names)} files forever?",
+                                   QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if ans == QMessageBox.StandardButton.Yes and self.api.purge_trash(names): self.load()
+
+    def empty(self):
+        ans = QMessageBox.question(self, "Confirm", "Delete everything in trash forever?",
+                                   QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if ans == QMessageBox.StandardButton.Yes and self.api.purge_trash(): self.load()
 
 
 class DraggableTable(QTableWidget):
@@ -17,6 +70,8 @@ class DraggableTable(QTableWidget):
         self.setAcceptDrops(True)
         self.setDragEnabled(True)
         self.setDragDropMode(QAbstractItemView.DragDropMode.DragDrop)
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.viewport().setAcceptDrops(True)
 
     def dragEnterEvent(self, event: QDragEnterEvent):
@@ -42,18 +97,14 @@ class DraggableTable(QTableWidget):
         name_item = self.item(row, 0)
         filename = name_item.text()
         storage_name = name_item.data(Qt.ItemDataRole.UserRole)
+        version = name_item.data(Qt.ItemDataRole.UserRole + 2)
+        sha256 = name_item.data(Qt.ItemDataRole.UserRole + 3)
         temp_dir = tempfile.gettempdir()
         temp_path = os.path.join(temp_dir, filename)
+        cached = self.parent.api.fetch_blob(storage_name, version, sha256)
+        if not cached: return
         try:
-            import requests
-            url = f"http://127.0.0.1:8000/raw/{storage_name}"
-            r = requests.get(url, stream=True)
-            if r.status_code == 200:
-                with open(temp_path, 'wb') as f:
-                    r.raw.decode_content = True
-                    shutil.copyfileobj(r.raw, f)
-            else:
-                return
+            shutil.copyfile(cached, temp_path)
         except:
             return
         mime = QMimeData()
@@ -71,9 +122,17 @@ class MainWindow(QMainWindow):
         self.logout_callback = logout_callback
         self.raw_data = []
         self.current_storage_name = None
-
-        self.net_man = QNetworkAccessManager()
-        self.net_man.finished.connect(self.on_img_downloaded)
+        self.current_version = None
+        self.watch_worker = None
+        self.events_worker = None
+        self.preview_stale = False     # подія змінила відкритий файл - прев'ю оновимо з наступним списком
+        self.preview_workers = set()   # живі, поки не завершаться: QThread не можна знищувати на ходу
+
+        # Пачку подій склеюємо в одне оновлення списку
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(300)
+        self.reload_timer.timeout.connect(self.reload_if_idle)
 
         self.setWindowTitle(f"Desktop Drive - {username}")
         self.resize(1200, 700)
@@ -96,12 +155,17 @@ class MainWindow(QMainWindow):
         self.btn_share = QPushButton("🤝 Share");
         self.btn_share.clicked.connect(self.share)
         self.btn_share.setEnabled(False)
+        self.btn_link = QPushButton("🔗 Link");
+        self.btn_link.clicked.connect(self.create_link)
+        self.btn_link.setEnabled(False)
         self.btn_download = QPushButton("⬇ Download");
         self.btn_download.clicked.connect(self.download_selected)
         self.btn_download.setEnabled(False)
         self.btn_delete = QPushButton("🗑 Delete");
         self.btn_delete.clicked.connect(self.delete_selected)
         self.btn_delete.setEnabled(False)
+        btn_trash = QPushButton("♻ Trash");
+        btn_trash.clicked.connect(self.show_trash)
 
         self.combo_sort = QComboBox()
         self.combo_sort.addItems(["Default", "Uploader A-Z","Uploader Z-A"])
@@ -121,7 +185,9 @@ class MainWindow(QMainWindow):
         toolbar.addWidget(btn_upload)
         toolbar.addWidget(self.btn_download);
         toolbar.addWidget(self.btn_delete)
+        toolbar.addWidget(btn_trash)
         toolbar.addWidget(self.btn_share);
+        toolbar.addWidget(self.btn_link)
         toolbar.addWidget(btn_sync)
         toolbar.addWidget(QLabel("|"));
         toolbar.addWidget(self.combo_sort)
@@ -151,6 +217,17 @@ class MainWindow(QMainWindow):
         self.btn_save_changes.clicked.connect(self.save_text_changes)
         self.btn_save_changes.hide()
 
+        # Посторінкова навігація для великих файлів (прихована, поки файл влазить в одне вікно)
+        self.btn_prev_page = QPushButton("◀")
+        self.btn_prev_page.clicked.connect(self.prev_page)
+        self.btn_next_page = QPushButton("▶")
+        self.btn_next_page.clicked.connect(self.next_page)
+        self.lbl_page = QLabel("")
+        for w in (self.btn_prev_page, self.lbl_page, self.btn_next_page): w.hide()
+
+        header_layout.addWidget(self.btn_prev_page)
+        header_layout.addWidget(self.lbl_page)
+        header_layout.addWidget(self.btn_next_page)
         header_layout.addStretch()
         header_layout.addWidget(self.btn_save_changes)
 
@@ -182,16 +259,20 @@ class MainWindow(QMainWindow):
     def load_data(self):
         self.raw_data = self.api.get_files()
         self.apply_filter_sort()
-        # Скидання
+        self.reset_preview()
+
+    def reset_preview(self):
         self.btn_download.setEnabled(False);
         self.btn_delete.setEnabled(False);
         self.btn_share.setEnabled(False)
+        self.btn_link.setEnabled(False)
         self.lbl_preview_img.show();
         self.lbl_preview_img.setText("Select a file");
         self.lbl_preview_img.setPixmap(QPixmap())
         self.txt_preview.hide();
         self.txt_preview.clear()
         self.btn_save_changes.hide()
+        self.show_page_controls(False)
         self.current_storage_name = None
 
     def apply_filter_sort(self):
@@ -213,6 +294,9 @@ class MainWindow(QMainWindow):
             # Зберігаємо приховані дані для логіки
             item_name.setData(Qt.ItemDataRole.UserRole, f['storage_name'])
             item_name.setData(Qt.ItemDataRole.UserRole + 1, f['access_type'])
+            item_name.setData(Qt.ItemDataRole.UserRole + 2, f.get('version'))
+            item_name.setData(Qt.ItemDataRole.UserRole + 3, f.get('sha256'))
+            item_name.setToolTip(f.get('path', '/') + f['filename'])
 
             self.table.setItem(i, 0, item_name)
             self.table.setItem(i, 1, QTableWidgetItem(f['extension']))
@@ -236,6 +320,7 @@ class MainWindow(QMainWindow):
         ext = self.table.item(row, 1).text()
 
         self.current_storage_name = storage_name
+        self.current_version = item.data(Qt.ItemDataRole.UserRole + 2)
 
         self.btn_download.setEnabled(True)
         self.btn_delete.setEnabled(True)
@@ -243,129 +328,305 @@ class MainWindow(QMainWindow):
         if access_type == 'owner':
             self.btn_share.setEnabled(True)
             self.btn_share.setToolTip("Share file")
+            self.btn_link.setEnabled(True)
             self.btn_delete.setText("🗑 Delete File")
         else:
             self.btn_share.setEnabled(False)
             self.btn_share.setToolTip("You can only share your own files")
+            self.btn_link.setEnabled(False)
             self.btn_delete.setText("🚫 Remove Access")
 
         self.lbl_preview_img.setText("Loading...")
         self.lbl_preview_img.show()
         self.txt_preview.hide()
         self.btn_save_changes.hide()
+        self.show_page_controls(False)
 
-        file_url = f"http://127.0.0.1:8000/raw/{storage_name}"
         can_edit = (ext == '.js') and (access_type == 'owner' or access_type == 'write')
 
         if ext == '.png':
-            self.net_man.get(QNetworkRequest(QUrl(file_url)))
+            # Прев'ю, завантаження і drag-out ідуть через спільний локальний кеш; мережа - у фоні
+            from workers import ImageFetchWorker
+            worker = ImageFetchWorker(self.api, storage_name, self.current_version,
+                                      item.data(Qt.ItemDataRole.UserRole + 3))
+            worker.fetched.connect(self.show_preview_image)
+            worker.finished.connect(lambda: self.preview_workers.discard(worker))
+            self.preview_workers.add(worker)
+            worker.start()
         elif ext == '.js':
             self.lbl_preview_img.hide()
             self.txt_preview.show()
-            self.txt_preview.setReadOnly(not can_edit)
-
-            import requests
-            try:
-                content = requests.get(file_url).text
-                self.txt_preview.blockSignals(True)
-                self.txt_preview.setText(content)
-                self.txt_preview.blockSignals(False)
-            except:
-                self.txt_preview.setText("Error loading")
+            # Файл читається вікнами через Range, а не цілком
+            self.can_edit_text = can_edit
+            self.page_history = []
+            self.load_page(0)
         else:
             self.lbl_preview_img.show();
             self.lbl_preview_img.clear();
             self.lbl_preview_img.setText("No preview available for this type.")
             self.txt_preview.hide()
 
+    def show_preview_image(self, storage_name, image):
+        # Поки картинка вантажилась, могли вибрати інший файл
+        if storage_name != self.current_storage_name: return
+        if not image.isNull():
+            self.lbl_preview_img.setPixmap(QPixmap.fromImage(image).scaled(400, 400, Qt.AspectRatioMode.KeepAspectRatio))
+            self.lbl_preview_img.setText("")
+        else:
+            self.lbl_preview_img.setText("Error loading")
+
+    def show_page_controls(self, visible):
+        for w in (self.btn_prev_page, self.lbl_page, self.btn_next_page): w.setVisible(visible)
+
+    def load_page(self, start):
+        from editor import WINDOW_SIZE, cut_page, decode_page
+        try:
+            data, total = self.api.read_range(self.current_storage_name, start, WINDOW_SIZE)
+        except Exception:
+            self.txt_preview.setPlainText("Error loading")
+            return
+        page_len = cut_page(data, start + len(data) >= total)
+        self.page_start = start
+        self.page_bytes = data[:page_len]
+
+        text, clean = decode_page(self.page_bytes)
+        # QTextEdit віддає рядки через \n - рідні переноси повертаємо при збереженні
+        self.page_text = text
+        editable = self.can_edit_text and clean
+        self.txt_preview.setReadOnly(not editable)
+        self.txt_preview.blockSignals(True)
+        self.txt_preview.setPlainText(text)
+        self.txt_preview.blockSignals(False)
+        self.btn_save_changes.hide()
+
+        paged = page_len < total
+        self.show_page_controls(paged)
+        if paged:
+            self.btn_prev_page.setEnabled(bool(self.page_history))
+            self.btn_next_page.setEnabled(start + page_len < total)
+            note = " (read-only)" if self.can_edit_text and not editable else ""
+            self.lbl_page.setText(f"{start:,}-{start + page_len:,} / {total:,} B{note}")
+
+    def confirm_discard(self):
+        if not self.btn_save_changes.isVisible(): return True
+        ans = QMessageBox.question(self, "Unsaved changes", "Discard changes on this page?",
+                                   QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        return ans == QMessageBox.StandardButton.Yes
+
+    def next_page(self):
+        if not self.confirm_discard(): return
+        self.page_history.append(self.page_start)
+        self.load_page(self.page_start + len(self.page_bytes))
+
+    def prev_page(self):
+        if not self.confirm_discard() or not self.page_history: return
+        self.load_page(self.page_history.pop())
+
     def on_text_edited(self):
         self.btn_save_changes.show()
 
     def save_text_changes(self):
+        from editor import changed_region, restore_line_endings
         if not self.current_storage_name: return
-        new_text = self.txt_preview.toPlainText()
+        new_text = restore_line_endings(self.page_text, self.txt_preview.toPlainText())
 
-        if self.api.update_content(self.current_storage_name, new_text):
+        # На сервер іде лише змінений фрагмент сторінки
+        region = changed_region(self.page_bytes, new_text.encode("utf-8"))
+        if region is None:
+            self.btn_save_changes.hide()
+            return
+        offset, length, data = region
+        status, version = self.api.update_range(self.current_storage_name, self.page_start + offset, length, data,
+                                                self.current_version)
+        if status == 200:
+            self.current_version = version
             QMessageBox.information(self, "Saved", "File updated successfully!")
             self.btn_save_changes.hide()
             self.load_data()
+        elif status == 409:
+            QMessageBox.warning(self, "Conflict", "File was changed by someone else. Refresh and try again.")
         else:
             QMessageBox.critical(self, "Error", "Failed to save changes")
 
     def download_selected(self):
+        rows = sorted({i.row() for i in self.table.selectedIndexes()})
+        if len(rows) > 1:
+            self.download_archive(rows)
+            return
         row = self.table.currentRow()
         if row < 0: return
         name = self.table.item(row, 0).text()
         storage_name = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)
+        version = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole + 2)
+        sha256 = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole + 3)
         save_path, _ = QFileDialog.getSaveFileName(self, "Save File", name)
         if save_path:
-            import requests
             try:
-                url = f"http://127.0.0.1:8000/raw/{storage_name}"
-                r = requests.get(url)
-                with open(save_path, 'wb') as f:
-                    f.write(r.content)
+                if not self.api.download_file(storage_name, save_path, version, sha256): raise IOError("Download failed")
                 QMessageBox.information(self, "Success", "Saved")
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
 
+    def download_archive(self, rows):
+        storage_names = [self.table.item(r, 0).data(Qt.ItemDataRole.UserRole) for r in rows]
+        save_path, _ = QFileDialog.getSaveFileName(self, "Save Archive", "files.zip", "ZIP (*.zip)")
+        if save_path:
+            try:
+                if not self.api.download_archive(storage_names, save_path): raise IOError("Download failed")
+                QMessageBox.information(self, "Success", f"Saved {len(storage_names)} files")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", str(e))
+
     def delete_selected(self):
+        rows = sorted({i.row() for i in self.table.selectedIndexes()})
+        if len(rows) > 1:
+            self.delete_many(rows)
+            return
         row = self.table.currentRow()
         if row < 0: return
         name = self.table.item(row, 0).text()
         storage_name = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)
         access_type = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole + 1)
 
-        msg = f"Delete file '{name}' permanently?" if access_type == 'owner' else f"Remove access to '{name}'?"
+        msg = f"Move '{name}' to trash?" if access_type == 'owner' else f"Remove access to '{name}'?"
 
         ans = QMessageBox.question(self, "Confirm", msg, QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if ans == QMessageBox.StandardButton.Yes:
-            import requests
-            try:
-                headers = {"Authorization": f"Bearer {self.api.token}"}
-                res = requests.delete(f"http://127.0.0.1:8000/delete/{storage_name}", headers=headers)
-                if res.status_code == 200:
-                    self.load_data()
-                    QMessageBox.information(self, "Done", "Operation successful.")
-                else:
-                    QMessageBox.warning(self, "Error", f"Code: {res.status_code}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", str(e))
+            code = self.api.delete_file(storage_name)
+            if code == 200:
+                self.load_data()
+                QMessageBox.information(self, "Done", "Operation successful.")
+            else:
+                QMessageBox.warning(self, "Error", f"Code: {code}")
+
+    def delete_many(self, rows):
+        # Масово - тільки власні файли, одним запитом
+        own = [self.table.item(r, 0).data(Qt.ItemDataRole.UserRole) for r in rows
+               if self.table.item(r, 0).data(Qt.ItemDataRole.UserRole + 1) == 'owner']
+        if not own:
+            QMessageBox.information(self, "Delete", "Only your own files can be deleted in bulk")
+            return
+        ans = QMessageBox.question(self, "Confirm", f"Move {len(own)} files to trash?",
+                                   QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if ans == QMessageBox.StandardButton.Yes:
+            count = self.api.delete_files(own)
+            if count is None:
+                QMessageBox.warning(self, "Error", "Failed to delete files")
+            self.load_data()
+
+    def show_trash(self):
+        TrashDialog(self.api, self).exec()
+        self.load_data()
 
     def logout(self):
+        self.stop_watch()
+        if self.events_worker:
+            self.events_worker.requestInterruption()
         self.api.token = None; self.close(); self.logout_callback()
 
-    def on_img_downloaded(self, reply):
-        http_status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
-        if http_status == 200:
-            data = reply.readAll()
-            pix = QPixmap()
-            if pix.loadFromData(data):
-                self.lbl_preview_img.setPixmap(pix.scaled(400, 400, Qt.AspectRatioMode.KeepAspectRatio))
-                self.lbl_preview_img.setText("")
-        reply.deleteLater()
-
     def upload_file(self, file_path=None):
         if not file_path: file_path, _ = QFileDialog.getOpenFileName(self)
-        if file_path: self.api.upload_file(file_path); self.load_data()
+        if not file_path: return
+        # Файл з тим самим ім'ям, вибраний у таблиці і доступний на запис, оновлюємо саме його
+        target = None
+        row = self.table.currentRow()
+        if row >= 0:
+            item = self.table.item(row, 0)
+            if item.text() == os.path.basename(file_path) and item.data(Qt.ItemDataRole.UserRole + 1) in ("owner", "write"):
+                target = item.data(Qt.ItemDataRole.UserRole)
+        self.api.upload_file(file_path, storage_name=target); self.load_data()
 
     def share(self):
         row = self.table.currentRow()
         if row < 0: return
-        fname = self.table.item(row, 0).text()
+        storage_name = self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)
         user, ok = QInputDialog.getText(self, "Share", "Target Username:")
         if ok and user:
             level, ok2 = QInputDialog.getItem(self, "Level", "Access:", ["read", "write"])
-            if ok2: self.api.share_file(fname, user, level)
+            if ok2: self.api.share_file(storage_name, user, level)
+
+    def create_link(self):
+        if not self.current_storage_name: return
+        hours, ok = QInputDialog.getInt(self, "Public link", "Lifetime (hours):", 24, 1, 30 * 24)
+        if not ok: return
+        url = self.api.create_link(self.current_storage_name, hours)
+        if url:
+            QApplication.clipboard().setText(url)
+            QMessageBox.information(self, "Public link", f"Copied to clipboard:\n{url}")
+        else:
+            QMessageBox.warning(self, "Error", "Could not create link")
 
     def toggle_cols(self):
         hidden = self.check_cols.isChecked()
         for c in [2, 3, 4, 5]: self.table.setColumnHidden(c, hidden)
 
     def sync(self):
-        from workers import SyncWorker
+        from workers import SyncWorker, WatchSyncWorker
         d = QFileDialog.getExistingDirectory(self)
         if d:
+            ans = QMessageBox.question(self, "Sync", "Keep watching this folder and upload changes automatically?",
+                                       QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if ans == QMessageBox.StandardButton.Yes:
+                self.stop_watch()
+                self.watch_worker = WatchSyncWorker(self.api, d)
+                self.watch_worker.log.connect(lambda s: self.statusBar().showMessage(s, 5000))
+                self.watch_worker.uploaded.connect(self.load_data)
+                self.watch_worker.start(QThread.Priority.LowPriority)
+                return
             self.worker = SyncWorker(self.api, d)
             self.worker.log.connect(lambda s: QMessageBox.information(self, "Sync", s))
-            self.worker.start()
\ No newline at end of file
+            self.worker.start()
+
+    def start_events(self):
+        from workers import EventsWorker
+        self.events_worker = EventsWorker(self.api)
+        self.events_worker.changed.connect(self.on_remote_change)
+        self.events_worker.start()
+
+    def on_remote_change(self, event):
+        if event.get("storage_name") == self.current_storage_name:
+            self.preview_stale = True
+        self.reload_timer.start()
+
+    def reload_if_idle(self):
+        # Не затираємо незбережені правки в редакторі
+        if self.btn_save_changes.isVisible():
+            self.reload_timer.start(2000)
+            return
+        self.refresh_rows()
+
+    def refresh_rows(self):
+        """
+        Оновлює рядки таблиці після подій, не чіпаючи виділення і відкрите прев'ю (сторінку, позицію).
+        Прев'ю перезавантажується лише тоді, коли подія стосувалась саме відкритого файлу
+        і його версія справді змінилась (власне збереження версію вже врахувало).
+        """
+        selected = {self.table.item(i.row(), 0).data(Qt.ItemDataRole.UserRole) for i in self.table.selectedIndexes()}
+        self.raw_data = self.api.get_files()
+        self.apply_filter_sort()
+
+        model = self.table.selectionModel()
+        rows = {}
+        for r in range(self.table.rowCount()):
+            storage_name = self.table.item(r, 0).data(Qt.ItemDataRole.UserRole)
+            rows[storage_name] = r
+            if storage_name in selected:
+                model.select(self.table.model().index(r, 0), QItemSelectionModel.SelectionFlag.Select
+                             | QItemSelectionModel.SelectionFlag.Rows)
+
+        stale, self.preview_stale = self.preview_stale, False
+        if not self.current_storage_name: return
+        row = rows.get(self.current_storage_name)
+        if row is None:
+            # Відкритий файл видалили або забрали доступ
+            self.reset_preview()
+            return
+        self.table.setCurrentCell(row, 0, QItemSelectionModel.SelectionFlag.NoUpdate)
+        if stale and self.table.item(row, 0).data(Qt.ItemDataRole.UserRole + 2) != self.current_version:
+            self.on_file_click(row, 0)
+
+    def stop_watch(self):
+        if self.watch_worker:
+            self.watch_worker.requestInterruption()
+            self.watch_worker.wait()
+            self.watch_worker = None
\ No newline at end of file
@@ -33,6 +33,7 @@ class LoginWindow(QWidget):
         if self.api.login(self.u.text(), self.p.text()):
             # Передаємо self.show як callback для logout
             self.main = MainWindow(self.api, self.u.text(), self.show)
+            self.main.start_events()
             self.main.show()
             self.close()
         else:
@@ -1,5 +1,45 @@
+import hashlib
 import os
+import sqlite3
+import threading
+import time
 from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtGui import QImage
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from cache import DEFAULT_DIR, sha256_file
+
+DEBOUNCE_SEC = 0.5          # скільки чекаємо тиші після останньої зміни файлу
+RETRY_SEC = 30              # повтор невдалого вивантаження
+RECONCILE_SEC = 15 * 60     # повне звіряння з сервером, на випадок пропущених подій
+IGNORED_SUFFIXES = ("~", ".swp", ".tmp", ".part")
+
+
+def remote_dir_for(root, base):
+    rel = os.path.relpath(root, base)
+    return "/" if rel == "." else "/" + rel.replace(os.sep, "/") + "/"
+
+
+def needs_upload(path, remote):
+    """
+    Чи треба вивантажувати локальний файл. remote - запис з /files або None.
+    Розмір порівнюється першим, хеш рахується тільки для файлів однакового розміру.
+    """
+    if remote is None: return True
+    if not remote.get('sha256'): return False  # старий запис без хешу - як і раніше, не чіпаємо
+    try:
+        if os.path.getsize(path) != remote.get('size'): return True
+        return sha256_file(path) != remote['sha256']
+    except OSError:
+        return False  # файл зник або недоступний - подія ФС підхопить його пізніше
+
+
+def remote_index(remote_files):
+    # Ключ - (папка на сервері, ім'я), щоб однакові імена в різних папках не плутались.
+    # /files віддає й чужі файли, якими з нами поділились; вивантаження ж іде у власні папки,
+    # тож чужий файл з тим самим шляхом не має ні приховувати наш, ні бути з ним порівняним
+    return {(f.get('path', '/'), f['filename']): f for f in remote_files if f.get('access_type') == 'owner'}
 
 
 class SyncWorker(QThread):
@@ -12,16 +52,182 @@ class SyncWorker(QThread):
 
     def run(self):
         self.log.emit("Sync started...")
-        remote_files = self.api.get_files()
-        remote_names = [f['filename'] for f in remote_files]
+        remote = remote_index(self.api.get_files())
 
-        local_files = os.listdir(self.folder)
         count = 0
-        for f in local_files:
-            path = os.path.join(self.folder, f)
-            if os.path.isfile(path) and f not in remote_names:
-                self.log.emit(f"Uploading new file: {f}")
-                self.api.upload_file(path)
-                count += 1
-
-        self.log.emit(f"Sync finished. Uploaded {count} files.")
\ No newline at end of file
+        # os.walk проходить піддерева через scandir, без окремого stat на кожен запис
+        for root, dirs, files in os.walk(self.folder):
+            remote_dir = remote_dir_for(root, self.folder)
+            for f in files:
+                path = os.path.join(root, f)
+                if needs_upload(path, remote.get((remote_dir, f))):
+                    self.log.emit(f"Uploading: {remote_dir}{f}")
+                    self.api.upload_file(path, remote_dir)
+                    count += 1
+
+        self.log.emit(f"Sync finished. Uploaded {count} files.")
+
+
+class SyncQueue:
+    """
+    Персистентна черга змінених шляхів (SQLite), переживає перезапуск клієнта.
+    Повторна подія для того ж шляху лише зсуває його термін - так склеюються швидкі записи.
+    """
+
+    def __init__(self, db_path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS pending (path TEXT PRIMARY KEY, due REAL)")
+        self.conn.commit()
+
+    def push(self, path, delay=DEBOUNCE_SEC):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO pending (path, due) VALUES (?, ?)", (path, time.time() + delay))
+            self.conn.commit()
+
+    def due(self, limit=100):
+        with self.lock:
+            rows = self.conn.execute("SELECT path FROM pending WHERE due <= ? ORDER BY due LIMIT ?",
+                                     (time.time(), limit)).fetchall()
+        return [r[0] for r in rows]
+
+    def done(self, path):
+        with self.lock:
+            self.conn.execute("DELETE FROM pending WHERE path = ?", (path,))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class _QueueHandler(FileSystemEventHandler):
+    def __init__(self, queue):
+        self.queue = queue
+
+    def _push(self, path):
+        if os.path.basename(path).endswith(IGNORED_SUFFIXES): return
+        if os.path.isdir(path):
+            # Папку перенесли/створили цілою - подій на вкладені файли може не бути
+            for root, _, files in os.walk(path):
+                for f in files: self._push(os.path.join(root, f))
+        else:
+            self.queue.push(path)
+
+    def on_created(self, event):
+        self._push(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory: self._push(event.src_path)
+
+    def on_moved(self, event):
+        self._push(event.dest_path)
+
+
+class WatchSyncWorker(QThread):
+    """Безперервна синхронізація: події ФС (inotify через watchdog) + рідке фонове звіряння."""
+    log = pyqtSignal(str)
+    uploaded = pyqtSignal()
+
+    def __init__(self, api, folder, queue_path=None):
+        super().__init__()
+        self.api = api
+        self.folder = os.path.abspath(folder)
+        if queue_path is None:
+            key = hashlib.sha1(self.folder.encode("utf-8")).hexdigest()[:16]
+            queue_path = os.path.join(DEFAULT_DIR, f"sync-{key}.db")
+        self.queue_path = queue_path
+
+    def run(self):
+        os.makedirs(os.path.dirname(self.queue_path), exist_ok=True)
+        self.queue = SyncQueue(self.queue_path)
+        observer = Observer()
+        observer.schedule(_QueueHandler(self.queue), self.folder, recursive=True)
+        observer.start()
+        self.log.emit(f"Watching {self.folder}")
+
+        # Перше звіряння одразу - підхоплює зміни, зроблені поки клієнт був вимкнений
+        last_reconcile = 0
+        try:
+            while not self.isInterruptionRequested():
+                self.flush()
+                if time.time() - last_reconcile > RECONCILE_SEC:
+                    self.reconcile()
+                    last_reconcile = time.time()
+                self.msleep(200)
+        finally:
+            observer.stop()
+            observer.join()
+            self.queue.close()
+
+    def flush(self):
+        changed = False
+        for path in self.queue.due():
+            if not os.path.isfile(path):
+                # Тимчасовий файл, який встигли видалити
+                self.queue.done(path)
+                continue
+            remote_dir = remote_dir_for(os.path.dirname(path), self.folder)
+            if self.api.upload_file(path, remote_dir):
+                self.queue.done(path)
+                self.log.emit(f"Uploaded {remote_dir}{os.path.basename(path)}")
+                changed = True
+            else:
+                self.queue.push(path, RETRY_SEC)
+        if changed: self.uploaded.emit()
+
+    def reconcile(self):
+        """Низькопріоритетний обхід дерева: ставить у чергу нові файли і ті, що відрізняються від сервера."""
+        remote = remote_index(self.api.get_files())
+        for i, (root, _, files) in enumerate(os.walk(self.folder)):
+            if self.isInterruptionRequested(): return
+            remote_dir = remote_dir_for(root, self.folder)
+            for f in files:
+                path = os.path.join(root, f)
+                if not f.endswith(IGNORED_SUFFIXES) and needs_upload(path, remote.get((remote_dir, f))):
+                    self.queue.push(path, 0)
+            # Поступаємось диском і CPU, щоб обхід великого дерева не заважав подіям
+            if i % 50 == 49:
+                self.flush()
+                self.msleep(20)
+
+
+class ImageFetchWorker(QThread):
+    """Прев'ю картинки: завантаження через кеш і декодування - поза GUI-потоком."""
+    fetched = pyqtSignal(str, QImage)   # storage_name, зображення (isNull() - помилка)
+
+    def __init__(self, api, storage_name, version=None, sha256=None):
+        super().__init__()
+        self.api = api
+        self.storage_name = storage_name
+        self.version = version
+        self.sha256 = sha256
+
+    def run(self):
+        path = self.api.fetch_blob(self.storage_name, self.version, self.sha256)
+        self.fetched.emit(self.storage_name, QImage(path) if path else QImage())
+
+
+class EventsWorker(QThread):
+    """Слухає /events (SSE) і повідомляє GUI про зміни. Після обриву продовжує з останнього id."""
+    changed = pyqtSignal(dict)
+
+    def __init__(self, api):
+        super().__init__()
+        self.api = api
+        self.cursor = None
+
+    def run(self):
+        backoff = 1
+        while not self.isInterruptionRequested():
+            try:
+                for event in self.api.stream_events(self.cursor):
+                    if self.isInterruptionRequested(): return
+                    self.cursor = event.get("id", self.cursor)
+                    if event.get("kind") not in ("hello", "ping"):
+                        self.changed.emit(event)
+                    backoff = 1
+            except Exception as e:
+                print(f"Events error: {e}")
+            # Сервер недоступний - перепідключаємось з наростаючою паузою
+            self.msleep(backoff * 1000)
+            backoff = min(backoff * 2, 30)
@@ -0,0 +1,70 @@
+import io
+import posixpath
+import zipfile
+
+import storage
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class _Sink(io.RawIOBase):
+    """Несікабельний потік: zipfile пише сюди, генератор одразу віддає накопичене клієнту."""
+
+    def __init__(self):
+        self.chunks = []
+        self.pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        self.pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.pos
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def unique_names(entries):
+    """[(arcname, storage_name)] з унікальними arcname: 'a.txt', 'a (2).txt', ..."""
+    used = set()
+    result = []
+    for arcname, storage_name in entries:
+        name, n = arcname, 1
+        root, ext = posixpath.splitext(arcname)
+        while name in used:
+            n += 1
+            name = f"{root} ({n}){ext}"
+        used.add(name)
+        result.append((name, storage_name))
+    return result
+
+
+def stream_zip(entries):
+    """
+    Генерує ZIP на льоту: без тимчасового файлу, пам'ять обмежена одним чанком.
+    Потік несікабельний, тому zipfile пише data descriptor після кожного файлу;
+    ZIP64 вмикається автоматично для файлів > 4 ГіБ і архівів > 65535 записів.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for arcname, storage_name in entries:
+            path = storage.blob_path(storage_name)
+            try:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+            except OSError:
+                continue  # блоб зник між перевіркою і читанням
+            with open(path, "rb") as src, zf.open(info, "w") as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk: break
+                    dst.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import defaultdict
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
+
+import models
+
+LEVELS = {None: 0, "read": 1, "write": 2, "owner": 3}
+
+# Кеш процесу живе недовго: інвалідація локальна, інші воркери побачать зміну не пізніше TTL
+CACHE_TTL = 5.0
+CACHE_MAX = 100_000
+
+_lock = threading.Lock()
+_cache = {}                   # (user_id, file_id) -> (level, expires_at)
+_by_file = defaultdict(set)   # file_id -> {user_id}
+
+
+def _best(a, b):
+    return a if LEVELS[a] >= LEVELS[b] else b
+
+
+def _cache_get(user_id, file_id):
+    with _lock:
+        hit = _cache.get((user_id, file_id))
+        if hit and hit[1] > time.monotonic(): return True, hit[0]
+    return False, None
+
+
+def _cache_put(user_id, levels):
+    expires = time.monotonic() + CACHE_TTL
+    with _lock:
+        if len(_cache) > CACHE_MAX:
+            _cache.clear()
+            _by_file.clear()
+        for file_id, level in levels.items():
+            _cache[(user_id, file_id)] = (level, expires)
+            _by_file[file_id].add(user_id)
+
+
+def invalidate(file_id=None):
+    """Хук для share/delete/зміни груп. Без file_id - скидає весь кеш."""
+    with _lock:
+        if file_id is None:
+            _cache.clear()
+            _by_file.clear()
+            return
+        for user_id in _by_file.pop(file_id, ()):
+            _cache.pop((user_id, file_id), None)
+
+
+def resolve_many(db, user, files):
+    """
+    Рівень доступу користувача до кожного файлу: {file_id: 'owner'|'write'|'read'|None}.
+    Спершу кеш запиту (db.info), далі кеш процесу, решта - одним запитом на всю пачку.
+    """
+    request_cache = db.info.setdefault("authz", {})
+    result, pending = {}, []
+    for f in files:
+        key = (user.id, f.id)
+        if key in request_cache:
+            result[f.id] = request_cache[key]
+        elif f.owner_id == user.id:
+            result[f.id] = "owner"
+        else:
+            hit, level = _cache_get(user.id, f.id)
+            if hit: result[f.id] = level
+            else: pending.append(f.id)
+
+    if pending:
+        levels = dict.fromkeys(pending)
+        direct = db.query(models.Permission.file_id, models.Permission.access_level).filter(
+            models.Permission.user_id == user.id, models.Permission.file_id.in_(pending))
+        via_groups = db.query(models.GroupPermission.file_id, models.GroupPermission.access_level) \
+            .join(models.GroupMember, models.GroupMember.group_id == models.GroupPermission.group_id) \
+            .filter(models.GroupMember.user_id == user.id, models.GroupPermission.file_id.in_(pending))
+        for file_id, level in direct.union_all(via_groups):
+            levels[file_id] = _best(levels[file_id], level)
+        _cache_put(user.id, levels)
+        result.update(levels)
+
+    for file_id, level in result.items():
+        request_cache[(user.id, file_id)] = level
+    return result
+
+
+def access_level(db, user, file):
+    return resolve_many(db, user, [file])[file.id]
+
+
+def require(db, user, file, level):
+    have = access_level(db, user, file)
+    if have is None or file.trashed: raise HTTPException(404, "Not found")
+    if LEVELS[have] < LEVELS[level]:
+        raise HTTPException(403, "Read only access" if level == "write" else "Access denied")
+    return have
+
+
+def visible_filter(user):
+    """Умова для запиту File: власні файли + розшарені напряму або через групу, без кошика."""
+    direct = select(models.Permission.file_id).where(models.Permission.user_id == user.id)
+    via_groups = select(models.GroupPermission.file_id) \
+        .join(models.GroupMember, models.GroupMember.group_id == models.GroupPermission.group_id) \
+        .where(models.GroupMember.user_id == user.id)
+    return and_(models.File.trashed.is_(False),
+                or_(models.File.owner_id == user.id, models.File.id.in_(direct), models.File.id.in_(via_groups)))
+
+
+def audience(db, file):
+    """Хто бачить файл: власник, прямі права та учасники груп."""
+    return audience_many(db, [file])[file.id]
+
+
+def audience_many(db, files):
+    """{file_id: {user_id}} для пачки файлів - двома запитами незалежно від її розміру."""
+    result = {f.id: {f.owner_id} for f in files}
+    ids = list(result)
+    for file_id, user_id in db.query(models.Permission.file_id, models.Permission.user_id) \
+            .filter(models.Permission.file_id.in_(ids)):
+        result[file_id].add(user_id)
+    for file_id, user_id in db.query(models.GroupPermission.file_id, models.GroupMember.user_id) \
+            .join(models.GroupMember, models.GroupMember.group_id == models.GroupPermission.group_id) \
+            .filter(models.GroupPermission.file_id.in_(ids)):
+        result[file_id].add(user_id)
+    return result
@@ -0,0 +1,103 @@
+"""
+Бенчмарк віддачі великих файлів: пропускна здатність і пам'ять (RSS) сервера та клієнтів.
+
+Запуск (з папки server):
+    python bench_download.py --size-gb 2 --clients 4
+
+Піднімає `python main.py` на тимчасовій БД і тимчасовому STORAGE_DIR, вивантажує
+маленький файл і підміняє його блоб розрідженим (sparse) файлом потрібного розміру,
+щоб не писати гігабайти на диск. Далі --clients потоків одночасно качають файл
+потоком на диск з буфером 1 МіБ (так само, як CloudAPI.download_file).
+Окремо перевіряються випадкові Range-запити по 1 МіБ.
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from loadtest import wait_ready
+
+CHUNK = 1024 * 1024
+
+
+def peak_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def download(url, headers, dest):
+    with requests.get(url, headers=headers, stream=True) as r:
+        r.raise_for_status()
+        with open(dest, "wb") as f:
+            for chunk in r.iter_content(CHUNK):
+                f.write(chunk)
+
+
+def concurrent_downloads(url, headers, clients, tmp):
+    threads = [threading.Thread(target=download, args=(url, headers, os.path.join(tmp, f"dl{i}")))
+               for i in range(clients)]
+    started = time.time()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return time.time() - started
+
+
+def random_ranges(url, headers, size, count):
+    s = requests.Session()
+    started = time.time()
+    for _ in range(count):
+        start = random.randrange(0, max(size - CHUNK, 1))
+        r = s.get(url, headers={**headers, "Range": f"bytes={start}-{start + CHUNK - 1}"})
+        assert r.status_code == 206 and len(r.content) == min(CHUNK, size - start)
+    return time.time() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-gb", type=float, default=2)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--ranges", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+
+    size = int(args.size_gb * 1024 ** 3)
+    base_url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_dir = os.path.join(tmp, "storage")
+        env = dict(os.environ, PORT=str(args.port), STORAGE_DIR=storage_dir,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        proc = subprocess.Popen([sys.executable, "main.py"], env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_ready(base_url): raise RuntimeError("Server did not start")
+            requests.post(f"{base_url}/register", data={"username": "bench", "password": "bench"})
+            token = requests.post(f"{base_url}/token", data={"username": "bench", "password": "bench"}).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            requests.post(f"{base_url}/upload", files={"file": ("big.bin", b"x")}, headers=headers)
+            storage_name = requests.get(f"{base_url}/files", headers=headers).json()[0]["storage_name"]
+            with open(os.path.join(storage_dir, storage_name), "r+b") as f:
+                f.truncate(size)
+            url = f"{base_url}/raw/{storage_name}"
+
+            elapsed = concurrent_downloads(url, headers, args.clients, tmp)
+            total_mb = size * args.clients / 1024 ** 2
+            print(f"full downloads: {args.clients} x {args.size_gb} GiB in {elapsed:.1f}s = {total_mb / elapsed:.0f} MiB/s")
+
+            elapsed = random_ranges(url, headers, size, args.ranges)
+            print(f"range reads:    {args.ranges} x 1 MiB in {elapsed:.1f}s = {args.ranges / elapsed:.0f} req/s")
+
+            client_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"peak RSS:       server {peak_rss_mb(proc.pid):.0f} MiB, client {client_rss:.0f} MiB")
+        finally:
+            proc.terminate()
+            proc.wait()
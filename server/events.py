@@ -0,0 +1,164 @@
+import asyncio
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, or_
+from starlette.concurrency import run_in_threadpool
+
+import models, database, authz
+
+POLL_SEC = 0.5
+HEARTBEAT_SEC = 15
+QUEUE_SIZE = 256
+RETENTION = timedelta(days=1)
+PRUNE_EVERY_SEC = 600
+# На Postgres id з послідовності видається до commit, тож подія з меншим id може з'явитися пізніше
+# за більший. Останні LATE_COMMIT секунд журналу переглядаються повторно (довша транзакція - рідкість)
+LATE_COMMIT = timedelta(seconds=30)
+FETCH_LIMIT = 5000
+
+
+def notify(db, file, kind, users=None):
+    """Додає події в поточну транзакцію - вони з'являться тільки разом з commit самої зміни."""
+    for uid in (users if users is not None else authz.audience(db, file)):
+        db.add(models.Event(user_id=uid, kind=kind, storage_name=file.storage_name, filename=file.display_name))
+
+
+def notify_many(db, files, kind):
+    """notify для пачки файлів: аудиторія двома запитами, вставка одним executemany."""
+    audience = authz.audience_many(db, files)
+    rows = [{"user_id": uid, "kind": kind, "storage_name": f.storage_name, "filename": f.display_name}
+            for f in files for uid in audience[f.id]]
+    if rows: db.execute(insert(models.Event), rows)
+
+
+def _event_dict(e):
+    return {"id": e.id, "kind": e.kind, "storage_name": e.storage_name, "filename": e.filename}
+
+
+def format_sse(event, cursor=None):
+    """cursor - що клієнт надішле в Last-Event-ID; не менший за вже відправлені, навіть для пізньої події."""
+    return f"id: {cursor if cursor is not None else event['id']}\nevent: {event['kind']}\ndata: {json.dumps(event)}\n\n"
+
+
+class Hub:
+    """
+    Розсилка подій у межах процесу. Один цикл опитує таблицю events (id > останній + пізні
+    commit'и за LATE_COMMIT), тому вартість не залежить від кількості підключень: кожне
+    з'єднання - лише asyncio.Queue. Події пишуться в БД, тож працює і з кількома воркерами/вузлами.
+    """
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.last_id = None
+        self.seen = {}  # id -> created_at розісланих за останні LATE_COMMIT, щоб не повторювати
+        self.task = None
+        self.lock = asyncio.Lock()
+
+    def _recent(self, db, upto_id, since):
+        return db.query(models.Event.id, models.Event.created_at).filter(
+            models.Event.id <= upto_id, models.Event.created_at >= since).all()
+
+    def _head(self):
+        with database.SessionLocal() as db:
+            head = db.query(models.Event.id).order_by(models.Event.id.desc()).limit(1).scalar() or 0
+            # Те, що вже є в журналі на момент старту, не розсилаємо
+            return head, dict(self._recent(db, head, datetime.now() - LATE_COMMIT))
+
+    def _fetch(self, after_id, since):
+        with database.SessionLocal() as db:
+            late = [i for i, _ in self._recent(db, after_id, since) if i not in self.seen]
+            rows = db.query(models.Event).filter(models.Event.id > after_id) \
+                .order_by(models.Event.id).limit(FETCH_LIMIT).all()
+            if late:
+                rows = db.query(models.Event).filter(models.Event.id.in_(late)).all() + rows
+            return [(e.user_id, _event_dict(e), e.created_at) for e in rows]
+
+    def _prune(self):
+        with database.SessionLocal() as db:
+            db.query(models.Event).filter(models.Event.created_at < datetime.now() - RETENTION).delete()
+            db.commit()
+
+    def backlog(self, user_id, after_id):
+        """Події після курсора плюс пізні commit'и за LATE_COMMIT - їх id може бути меншим за курсор."""
+        since = datetime.now() - LATE_COMMIT
+        with database.SessionLocal() as db:
+            rows = db.query(models.Event).filter(
+                models.Event.user_id == user_id,
+                or_(models.Event.id > after_id, models.Event.created_at >= since)) \
+                .order_by(models.Event.id).limit(FETCH_LIMIT).all()
+            return [_event_dict(e) for e in rows]
+
+    async def start(self):
+        # Перші підключення приходять одночасно - без блокування запустилося б два цикли
+        async with self.lock:
+            if self.task is None:
+                self.last_id, self.seen = await run_in_threadpool(self._head)
+                self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        last_prune = 0
+        while True:
+            try:
+                since = datetime.now() - LATE_COMMIT
+                for user_id, event, created_at in await run_in_threadpool(self._fetch, self.last_id, since):
+                    self.last_id = max(self.last_id, event["id"])
+                    self.seen[event["id"]] = created_at
+                    for q in list(self.subscribers.get(user_id, ())):
+                        try:
+                            q.put_nowait(event)
+                        except asyncio.QueueFull:
+                            # Повільний клієнт: закриваємо потік, він перепідключиться з курсором
+                            self.unsubscribe(user_id, q)
+                            while not q.empty(): q.get_nowait()
+                            q.put_nowait(None)
+                self.seen = {i: t for i, t in self.seen.items() if t >= since}
+                if asyncio.get_running_loop().time() - last_prune > PRUNE_EVERY_SEC:
+                    await run_in_threadpool(self._prune)
+                    last_prune = asyncio.get_running_loop().time()
+            except Exception as e:
+                print(f"Event hub error: {e}")
+            await asyncio.sleep(POLL_SEC)
+
+    def subscribe(self, user_id):
+        q = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers[user_id].add(q)
+        return q
+
+    def unsubscribe(self, user_id, q):
+        subs = self.subscribers.get(user_id)
+        if subs is not None:
+            subs.discard(q)
+            if not subs: self.subscribers.pop(user_id, None)
+
+    async def stream(self, user_id, cursor):
+        """SSE-потік для користувача, з догоном пропущених подій після cursor."""
+        await self.start()
+        q = self.subscribe(user_id)
+        try:
+            last_sent = cursor if cursor is not None else self.last_id
+            # Одразу повідомляємо клієнту поточний курсор
+            yield f"id: {last_sent}\nevent: hello\ndata: {{}}\n\n"
+            # id не монотонні (пізні commit'и), тому повтори з черги відсіюємо за множиною, а не за "<="
+            sent = set()
+            if cursor is not None:
+                for event in await run_in_threadpool(self.backlog, user_id, cursor):
+                    sent.add(event["id"])
+                    last_sent = max(last_sent, event["id"])
+                    yield format_sse(event, last_sent)
+            while True:
+                try:
+                    event = await asyncio.wait_for(q.get(), HEARTBEAT_SEC)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None: break
+                if event["id"] in sent: continue
+                last_sent = max(last_sent, event["id"])
+                yield format_sse(event, last_sent)
+        finally:
+            self.unsubscribe(user_id, q)
+
+
+hub = Hub()
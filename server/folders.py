@@ -0,0 +1,76 @@
+import posixpath
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal
+from sqlalchemy.exc import IntegrityError
+
+import models
+
+ROOT = "/"
+
+
+def normalize(path):
+    """'a/b', '/a/b/' -> '/a/b/'. Корінь - '/'."""
+    parts = [p for p in (path or "").replace("\\", "/").split("/") if p]
+    if any(p in (".", "..") for p in parts):
+        raise HTTPException(400, "Invalid path")
+    return ROOT + "".join(p + "/" for p in parts)
+
+
+def parent_of(path):
+    if path == ROOT: return None
+    return normalize(posixpath.dirname(path.rstrip("/")))
+
+
+def resolve(db, owner_id, path):
+    """Пошук по індексу (owner_id, path) - один B-tree lookup незалежно від глибини."""
+    path = normalize(path)
+    if path == ROOT: return None
+    folder = db.query(models.Folder).filter_by(owner_id=owner_id, path=path).first()
+    if not folder: raise HTTPException(404, "Folder not found")
+    return folder
+
+
+def ensure(db, owner_id, path):
+    """mkdir -p. Повертає папку (None для кореня)."""
+    path = normalize(path)
+    if path == ROOT: return None
+    folder = db.query(models.Folder).filter_by(owner_id=owner_id, path=path).first()
+    if folder: return folder
+
+    parent = ensure(db, owner_id, parent_of(path))
+    try:
+        with db.begin_nested():
+            folder = models.Folder(owner_id=owner_id, parent_id=parent.id if parent else None,
+                                   name=posixpath.basename(path.rstrip("/")), path=path)
+            db.add(folder)
+    except IntegrityError:
+        # Паралельний запит створив ту саму папку
+        folder = db.query(models.Folder).filter_by(owner_id=owner_id, path=path).one()
+    return folder
+
+
+def move(db, folder, new_path):
+    """Перейменування/переміщення піддерева - тільки метадані, блоби не чіпаємо."""
+    old_path = folder.path
+    new_path = normalize(new_path)
+    if new_path == ROOT or new_path.startswith(old_path):
+        raise HTTPException(400, "Cannot move folder into itself")
+    if db.query(models.Folder).filter_by(owner_id=folder.owner_id, path=new_path).first():
+        raise HTTPException(400, "Target already exists")
+
+    parent = ensure(db, folder.owner_id, parent_of(new_path))
+    # Один UPDATE переписує префікс у всіх нащадків (і в самій папці)
+    db.query(models.Folder).filter(
+        models.Folder.owner_id == folder.owner_id,
+        models.Folder.path.startswith(old_path, autoescape=True)
+    ).update({models.Folder.path: literal(new_path) + func.substr(models.Folder.path, len(old_path) + 1)},
+             synchronize_session=False)
+    folder.parent_id = parent.id if parent else None
+    folder.name = posixpath.basename(new_path.rstrip("/"))
+    db.flush()
+    db.expire_all()
+
+
+def path_of(file):
+    return file.folder.path if file.folder else ROOT
@@ -0,0 +1,159 @@
+"""
+Перевірка узгодженості сховища з таблицею files.
+
+Запуск (з папки server, з тими ж DATABASE_URL / STORAGE_DIR, що й сервер):
+    python fsck.py                 # тільки звіт
+    python fsck.py --repair        # + відновлення завислих записів, прибирання сиріт, виправлення розмірів
+    python fsck.py --verify        # + перечитати блоби і звірити sha256 (повільно, читає весь диск)
+
+Знаходить:
+  * orphans   - блоби на диску без запису в БД
+  * missing   - записи в БД без блоба
+  * mismatch  - розмір у БД не збігається з розміром на диску
+  * stale tmp - тимчасові файли без активного наміру запису
+  * corrupt   - (--verify) вміст блоба не збігається з sha256 у БД; автоматично не виправляється
+
+Диск сканується одним проходом os.scandir, stat виконується пачками паралельно,
+БД читається потоково (yield_per), тому пам'ять - це лише словник ім'я -> розмір.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import models, database, storage, migrate
+
+BATCH = 10000
+
+
+def _stat_batch(names):
+    sizes = {}
+    for name in names:
+        try:
+            st = os.stat(storage.blob_path(name))
+            sizes[name] = (st.st_size, st.st_mtime)
+        except FileNotFoundError:
+            pass
+    return sizes
+
+
+def scan_disk(workers):
+    disk = {}
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers) as pool, os.scandir(storage.STORAGE_DIR) as it:
+        futures = []
+        for entry in it:
+            if entry.name == os.path.basename(storage.TMP_DIR) or not entry.is_file(follow_symlinks=False):
+                continue
+            batch.append(entry.name)
+            if len(batch) >= BATCH:
+                futures.append(pool.submit(_stat_batch, batch))
+                batch = []
+        if batch:
+            futures.append(pool.submit(_stat_batch, batch))
+        for fut in futures:
+            disk.update(fut.result())
+    return disk
+
+
+def _corrupt(storage_name, sha256):
+    try:
+        return storage.hash_file(storage.blob_path(storage_name)) != sha256
+    except OSError:
+        return False  # блоб зник під час перевірки - це вже не корупція
+
+
+def verify_hashes(db, workers):
+    corrupt, batch = [], []
+    rows = db.query(models.File.storage_name, models.File.sha256).filter(models.File.sha256.isnot(None))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def run(batch):
+            flags = pool.map(lambda row: _corrupt(*row), batch)
+            corrupt.extend(name for (name, _), bad in zip(batch, flags) if bad)
+        for row in rows.yield_per(BATCH):
+            batch.append(tuple(row))
+            if len(batch) >= BATCH:
+                run(batch)
+                batch = []
+        run(batch)
+    return corrupt
+
+
+def check(db, workers):
+    disk = scan_disk(workers)
+    missing, mismatch = [], []
+
+    rows = db.query(models.File.storage_name, models.File.size).yield_per(BATCH)
+    for storage_name, size in rows:
+        on_disk = disk.pop(storage_name, None)
+        if on_disk is None:
+            missing.append(storage_name)
+        elif on_disk[0] != size:
+            mismatch.append((storage_name, size, on_disk[0]))
+
+    # Блоби з активним наміром ще пишуться - це не сироти
+    pending = {name for (name,) in db.query(models.WriteIntent.storage_name)}
+    orphans = {name: info for name, info in disk.items() if name not in pending}
+
+    pending_tmp = set()
+    for i, n in db.query(models.WriteIntent.id, models.WriteIntent.storage_name):
+        pending_tmp.update((f"{i}_{n}", f"{i}_{n}.old"))  # .old - попередній блоб до commit
+    stale_tmp = [n for n in os.listdir(storage.TMP_DIR) if n not in pending_tmp]
+
+    return orphans, missing, mismatch, stale_tmp
+
+
+def repair(db, orphans, mismatch, stale_tmp, grace):
+    recovered = storage.recover(db, grace=grace)
+
+    cutoff = time.time() - grace.total_seconds()
+    removed = 0
+    for name, (_, mtime) in orphans.items():
+        if mtime < cutoff:
+            os.remove(storage.blob_path(name))
+            removed += 1
+    for name in stale_tmp:
+        path = os.path.join(storage.TMP_DIR, name)
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+    # Блоб - джерело істини для розміру
+    for storage_name, _, disk_size in mismatch:
+        file = db.query(models.File).filter_by(storage_name=storage_name).first()
+        if file: file.size = disk_size
+    db.commit()
+    return recovered, removed
+
+
+def report(title, items, limit):
+    print(f"{title}: {len(items)}")
+    for item in list(items)[:limit]:
+        print(f"  {item}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repair", action="store_true")
+    parser.add_argument("--verify", action="store_true", help="re-hash every blob and compare with sha256 in DB")
+    parser.add_argument("--grace", type=int, default=int(storage.RECOVERY_GRACE.total_seconds()),
+                        help="seconds; younger orphans and intents are left alone")
+    parser.add_argument("--show", type=int, default=20)
+    args = parser.parse_args()
+
+    storage.ensure_dirs()
+    migrate.upgrade()
+    started = time.time()
+    with database.SessionLocal() as db:
+        orphans, missing, mismatch, stale_tmp = check(db, args.workers)
+        report("Orphan blobs", orphans, args.show)
+        report("Missing blobs", missing, args.show)
+        report("Size mismatches (name, db, disk)", mismatch, args.show)
+        report("Stale temp files", stale_tmp, args.show)
+        if args.verify:
+            report("Corrupt blobs (sha256 mismatch)", verify_hashes(db, args.workers), args.show)
+        if args.repair:
+            recovered, removed = repair(db, orphans, mismatch, stale_tmp, timedelta(seconds=args.grace))
+            print(f"Repair: {recovered} intents resolved, {removed} orphans removed, {len(mismatch)} sizes fixed")
+    print(f"Done in {time.time() - started:.1f}s")
@@ -0,0 +1,70 @@
+"""
+Оренди фонових робіт у БД (одна на всі процеси й вузли) та ідентифікатор процесу,
+за яким інші процеси того ж вузла можуть перевірити, чи він ще живий.
+"""
+import os
+import socket
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+import models
+
+DEFAULT_TTL = timedelta(seconds=60)
+
+
+def _boot_id():
+    # Після перезавантаження pid повторюються - без boot id мертвий процес можна сплутати з живим
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+_HOST = socket.gethostname()
+_BOOT = _boot_id()
+
+
+def process_id():
+    """'вузол:завантаження:pid'. pid беремо щоразу: воркери uvicorn - окремі процеси."""
+    return f"{_HOST}:{_BOOT}:{os.getpid()}"
+
+
+def is_dead(owner):
+    """True, лише коли точно відомо, що процес завершився. Про інші вузли не знаємо нічого - False."""
+    try:
+        host, boot, pid = owner.rsplit(":", 2)
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False
+    # На Windows os.kill(pid, 0) не перевіряє, а завершує процес
+    if host != _HOST or os.name == "nt": return False
+    if boot != _BOOT: return True
+    if pid == os.getpid(): return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False  # процес є, просто чужий
+    return False
+
+
+def acquire(db, name, holder=None, ttl=DEFAULT_TTL):
+    """Бере або продовжує оренду name і робить commit. True - holder тримає її до now + ttl."""
+    holder = holder or process_id()
+    now = datetime.now()
+    taken = db.query(models.Lease).filter(
+        models.Lease.name == name, or_(models.Lease.holder == holder, models.Lease.expires_at < now)) \
+        .update({models.Lease.holder: holder, models.Lease.expires_at: now + ttl}, synchronize_session=False)
+    if not taken:
+        try:
+            with db.begin_nested():
+                db.add(models.Lease(name=name, holder=holder, expires_at=now + ttl))
+            taken = 1
+        except IntegrityError:
+            taken = 0  # оренду тримає інший процес
+    db.commit()
+    return bool(taken)
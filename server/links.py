@@ -0,0 +1,162 @@
+import atexit
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, update
+
+import models, database, auth
+from responses import content_disposition
+
+SCOPE = "dl"                        # токен дає тільки читання одного блоба
+TICKET_SCOPE = "url"                # квиток: одна конкретна адреса від імені користувача
+TICKET_TTL_SEC = 300
+DEFAULT_TTL_HOURS = 24
+MAX_TTL_HOURS = 30 * 24
+# Скільки проксі/CDN може тримати відповідь: відкликання доходить до кешів не пізніше цього часу
+CACHE_MAX_AGE = 300
+REVOKED_REFRESH_SEC = 5.0           # як часто кожен процес перечитує список відкликаних
+FLUSH_SEC = 10.0
+FLUSH_BATCH = 1000
+
+_key = hashlib.sha256(f"share-links:{auth.SECRET_KEY}".encode()).digest()
+
+_revoked = set()
+_revoked_lock = threading.Lock()
+_next_refresh = 0.0
+
+_counts = Counter()
+_pending = 0
+_counts_lock = threading.Lock()
+_next_flush = time.monotonic() + FLUSH_SEC
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return hmac.new(_key, payload, hashlib.sha256).digest()
+
+
+def sign(link_id, storage_name, expires):
+    """Токен '<payload>.<підпис>'. expires - unix-час; все потрібне для віддачі лежить у самому токені."""
+    payload = f"{SCOPE}.{link_id}.{expires}.{storage_name}".encode()
+    return f"{_b64(payload)}.{_b64(_sign(payload))}"
+
+
+def _unpack(token):
+    """(scope, id, expires, subject) з перевіреного підпису; ValueError - підробка або сміття."""
+    payload_b64, sig_b64 = token.split(".")
+    payload = _unb64(payload_b64)
+    if not hmac.compare_digest(_sign(payload), _unb64(sig_b64)): raise ValueError(token)
+    scope, item_id, expires, subject = payload.decode().split(".", 3)
+    return scope, int(item_id), int(expires), subject
+
+
+def verify(token):
+    """(link_id, storage_name, expires) без звернення до БД. 404 - підробка, 410 - протерміновано або відкликано."""
+    try:
+        scope, link_id, expires, storage_name = _unpack(token)
+    except ValueError:
+        raise HTTPException(404)
+    if scope != SCOPE: raise HTTPException(404)
+    if expires <= time.time(): raise HTTPException(410, "Link expired")
+    if is_revoked(link_id): raise HTTPException(410, "Link revoked")
+    return link_id, storage_name, expires
+
+
+def sign_ticket(user_id, subject, ttl=None):
+    """
+    Короткоживучий квиток на одну адресу (subject - див. main.ticket_subject) для браузера,
+    який не може додати заголовок (<a download>, перехід на архів). На відміну від JWT у query,
+    з логів проксі чи історії браузера він дає лише цей файл і лише кілька хвилин.
+    """
+    expires = int(time.time()) + (TICKET_TTL_SEC if ttl is None else ttl)
+    payload = f"{TICKET_SCOPE}.{user_id}.{expires}.{subject}".encode()
+    return f"{_b64(payload)}.{_b64(_sign(payload))}"
+
+
+def verify_ticket(token, subject):
+    """user_id власника квитка. 401 - підробка, інша адреса або протерміновано."""
+    try:
+        scope, user_id, expires, signed_subject = _unpack(token)
+    except ValueError:
+        raise HTTPException(401)
+    if scope != TICKET_SCOPE or expires <= time.time() or signed_subject != subject:
+        raise HTTPException(401)
+    return user_id
+
+
+def _load_revoked():
+    global _revoked, _next_refresh
+    with database.SessionLocal() as db:
+        # Протерміновані відсікає сам підпис - тримаємо в пам'яті тільки ще живі
+        ids = {i for (i,) in db.query(models.ShareLink.id).filter(
+            models.ShareLink.revoked.is_(True), models.ShareLink.expires_at > datetime.now())}
+    _revoked = ids
+    _next_refresh = time.monotonic() + REVOKED_REFRESH_SEC
+
+
+def is_revoked(link_id):
+    if time.monotonic() >= _next_refresh:
+        with _revoked_lock:
+            if time.monotonic() >= _next_refresh: _load_revoked()
+    return link_id in _revoked
+
+
+def revoke(link_id):
+    """Локально - одразу; інші воркери побачать відкликання після свого оновлення списку."""
+    _revoked.add(link_id)
+
+
+def record_download(link_id):
+    """Лічильник у пам'яті; в БД пишемо пачкою раз на FLUSH_SEC або FLUSH_BATCH скачувань."""
+    global _pending
+    with _counts_lock:
+        _counts[link_id] += 1
+        _pending += 1
+        due = _pending >= FLUSH_BATCH or time.monotonic() >= _next_flush
+    if due: flush()
+
+
+def flush():
+    global _next_flush, _pending
+    with _counts_lock:
+        batch = dict(_counts)
+        _counts.clear()
+        _pending = 0
+        _next_flush = time.monotonic() + FLUSH_SEC
+    if not batch: return
+    table = models.ShareLink.__table__
+    stmt = update(table).where(table.c.id == bindparam("link_id")) \
+        .values(downloads=table.c.downloads + bindparam("n"))
+    try:
+        with database.SessionLocal() as db:
+            db.execute(stmt, [{"link_id": k, "n": n} for k, n in batch.items()])
+            db.commit()
+    except Exception as e:
+        print(f"Link counters flush error: {e}")
+        with _counts_lock:
+            _counts.update(batch)
+            _pending += sum(batch.values())
+
+
+atexit.register(flush)
+
+
+def cache_headers(storage_name, expires):
+    """Публічне кешування, але не довше за життя посилання."""
+    max_age = max(0, min(CACHE_MAX_AGE, int(expires - time.time())))
+    filename = storage_name.split("_", 1)[-1]
+    return {"cache-control": f"public, max-age={max_age}",
+            "content-disposition": content_disposition(filename, "inline")}
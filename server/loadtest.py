@@ -0,0 +1,98 @@
+"""
+Локальний стенд для перевірки масштабування сервера за кількістю воркерів.
+
+Запуск (з папки server):
+    python loadtest.py --workers 1 2 4 --clients 32 --seconds 10
+
+Для кожного значення --workers піднімається окремий `python main.py` з WORKERS=N
+на тимчасовій БД і тимчасовому STORAGE_DIR, створюється тестовий користувач
+з кількома файлами, після чого --clients потоків протягом --seconds секунд
+б'ють в GET /files. Виводиться пропускна здатність (req/s) для кожної конфігурації.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base_url}/", timeout=1)
+            return True
+        except requests.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def prepare_user(base_url, files=20):
+    requests.post(f"{base_url}/register", data={"username": "load", "password": "load"})
+    token = requests.post(f"{base_url}/token", data={"username": "load", "password": "load"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(files):
+        requests.post(f"{base_url}/upload", files={"file": (f"f{i}.txt", b"x" * 1024)}, headers=headers)
+    return headers
+
+
+def hammer(base_url, headers, clients, seconds):
+    stop_at = time.time() + seconds
+    counts = [0] * clients
+    errors = [0] * clients
+
+    def loop(idx):
+        s = requests.Session()
+        while time.time() < stop_at:
+            try:
+                r = s.get(f"{base_url}/files", headers=headers)
+                if r.status_code == 200:
+                    counts[idx] += 1
+                else:
+                    errors[idx] += 1
+            except requests.RequestException:
+                errors[idx] += 1
+
+    threads = [threading.Thread(target=loop, args=(i,)) for i in range(clients)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return sum(counts) / seconds, sum(errors)
+
+
+def run(workers, clients, seconds, port):
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   WORKERS=str(workers),
+                   PORT=str(port),
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'load.db')}",
+                   STORAGE_DIR=os.path.join(tmp, "storage"))
+        proc = subprocess.Popen([sys.executable, "main.py"], env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_ready(base_url):
+                raise RuntimeError("Server did not start")
+            headers = prepare_user(base_url)
+            return hammer(base_url, headers, clients, seconds)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    baseline = None
+    for w in args.workers:
+        rps, errs = run(w, args.clients, args.seconds, args.port)
+        baseline = baseline or rps
+        print(f"workers={w:<3} {rps:8.1f} req/s  x{rps / baseline:.2f}  errors={errs}")
@@ -1,30 +1,49 @@
+import io
 import os
-import shutil
+import stat
 import uuid
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from datetime import datetime
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, Form, Request, Body
+from urllib.parse import quote, urlencode
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, Form, Request, Body, Header, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, Response
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.orm import Session, joinedload
 from jose import JWTError, jwt
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-import models, database, auth
+import models, database, auth, storage, folders, events, authz, archive, links, trash, migrate
+from responses import BlobResponse, etag_for, content_disposition
 
-models.Base.metadata.create_all(bind=database.engine)
-app = FastAPI()
+migrate.upgrade()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # У кожному воркері, зокрема під `uvicorn main:app`; працює лише власник оренди в БД.
+    # Відновлення після падіння - теж тут: наміри мертвих процесів розбираються одразу при старті
+    storage.start_recovery()
+    trash.start_reaper()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-os.makedirs("storage", exist_ok=True)
+storage.ensure_dirs()
 app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/raw", StaticFiles(directory="storage"), name="raw")
 templates = Jinja2Templates(directory="templates")
 
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    return user_from_token(token, db)
+
+
+def user_from_token(token, db):
     try:
         payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
         username: str = payload.get("sub")
@@ -36,6 +55,26 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     return user
 
 
+def ticket_subject(path, params):
+    """Квиток підписує саму адресу: шлях і всі параметри, крім ticket, у стабільному порядку."""
+    return path + "?" + urlencode(sorted((k, v) for k, v in params if k != "ticket"))
+
+
+def get_user_header_or_ticket(request: Request, ticket: Optional[str] = None, db: Session = Depends(database.get_db)):
+    """
+    Як get_current_user, але браузер, що не вміє додати заголовок (<a download>, перехід на архів),
+    може прийти з ?ticket= від POST /download_url. JWT у адресу не потрапляє.
+    """
+    header = request.headers.get("authorization", "")
+    if header.startswith("Bearer "):
+        return user_from_token(header[len("Bearer "):], db)
+    if not ticket: raise HTTPException(status_code=401)
+    user_id = links.verify_ticket(ticket, ticket_subject(request.url.path, request.query_params.multi_items()))
+    user = db.get(models.User, user_id)
+    if user is None: raise HTTPException(status_code=401)
+    return user
+
+
 # --- MODELS ---
 class FileOut(BaseModel):
     id: int
@@ -48,17 +87,86 @@ class FileOut(BaseModel):
     editor: str
     access_type: str
     storage_name: str
+    version: int
+    path: str
+    sha256: Optional[str] = None
+    deleted_at: Optional[str] = None  # тільки для файлів у кошику
+
+
+class FolderListing(BaseModel):
+    path: str
+    folders: List[str]
+    files: List[FileOut]
+    next_cursor: Optional[int]
+
+
+class FolderRequest(BaseModel):
+    path: str
+
+
+class TrashListing(BaseModel):
+    files: List[FileOut]
+    next_cursor: Optional[int]
+
+
+class FileNamesRequest(BaseModel):
+    storage_names: List[str]
+
+
+class MoveFolderRequest(BaseModel):
+    src: str
+    dst: str
 
 
 class ShareRequest(BaseModel):
-    filename: str
-    target_user: str
+    storage_name: str
+    target_user: Optional[str] = None
+    target_group: Optional[str] = None  # одне право на всю групу замість рядка на кожного учасника
     level: str
 
 
+class GroupRequest(BaseModel):
+    name: str
+
+
+class GroupMemberRequest(BaseModel):
+    username: str
+
+
+class LinkRequest(BaseModel):
+    storage_name: str
+    hours: int = links.DEFAULT_TTL_HOURS
+
+
+class DownloadUrlRequest(BaseModel):
+    storage_name: Optional[str] = None   # один файл (/raw)
+    names: List[str] = []                # або архів з вибраних файлів
+    folder: Optional[str] = None         # та/або цілої папки
+
+
 class UpdateContentRequest(BaseModel):
     storage_name: str
     content: str
+    version: Optional[int] = None  # якщо передано - зберігаємо тільки поверх цієї версії
+
+
+def file_out(f, access):
+    return {
+        "id": f.id,
+        "filename": f.display_name,
+        "extension": f.extension,
+        "size": f.size,
+        "created_at": f.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "updated_at": f.updated_at.strftime("%Y-%m-%d %H:%M:%S"),  # <--- НОВЕ
+        "uploader": f.uploader_name,
+        "editor": f.editor_name,
+        "access_type": access,
+        "storage_name": f.storage_name,
+        "version": f.version,
+        "path": folders.path_of(f),
+        "sha256": f.sha256,
+        "deleted_at": f.deleted_at.strftime("%Y-%m-%d %H:%M:%S") if f.deleted_at else None
+    }
 
 
 # --- ROUTES ---
@@ -84,51 +192,33 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 
 @app.get("/files", response_model=List[FileOut])
 def list_files(user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
-    files = db.query(models.File).outerjoin(models.Permission).filter(
-        or_(models.File.owner_id == user.id, models.Permission.user_id == user.id)
-    ).all()
-
-    result = []
-    for f in files:
-        access = "owner"
-        if f.owner_id != user.id:
-            perm = next((p for p in f.permissions if p.user_id == user.id), None)
-            access = perm.access_level if perm else "read"
-
-        result.append({
-            "id": f.id,
-            "filename": f.display_name,
-            "extension": f.extension,
-            "size": f.size,
-            "created_at": f.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            "updated_at": f.updated_at.strftime("%Y-%m-%d %H:%M:%S"),  # <--- НОВЕ
-            "uploader": f.uploader_name,
-            "editor": f.editor_name,
-            "access_type": access,
-            "storage_name": f.storage_name
-        })
-    return result
+    files = db.query(models.File).options(joinedload(models.File.folder)).filter(authz.visible_filter(user)).all()
+
+    # Права для всього списку - однією пачкою
+    levels = authz.resolve_many(db, user, files)
+    return [file_out(f, levels[f.id] or "read") for f in files]
 
 
 @app.post("/upload")
-def upload(file: UploadFile, user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
-    # 1. Спочатку шукаємо, чи є такий файл У МЕНЕ (власник)
-    existing_my = db.query(models.File).filter(
-        models.File.display_name == file.filename,
-        models.File.owner_id == user.id
-    ).first()
-
-    # 2. Якщо немає, шукаємо, чи є такий файл, РОЗШАРЕНИЙ мені з правом WRITE
-    existing_shared = None
-    if not existing_my:
-        existing_shared = db.query(models.File).join(models.Permission).filter(
+def upload(file: UploadFile, path: str = Form(folders.ROOT), storage_name: Optional[str] = Form(None),
+           sha256: Optional[str] = Form(None), x_content_sha256: Optional[str] = Header(None),
+           user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
+    if storage_name is not None:
+        # Явно вибраний файл - свій або розшарений з правом WRITE. Чужі файли за ім'ям не шукаємо:
+        # однакові імена в різних папках власника так не розрізнити
+        target_file = db.query(models.File).filter_by(storage_name=storage_name).with_for_update().first()
+        if not target_file: raise HTTPException(404, "Not found")
+        authz.require(db, user, target_file, "write")
+    else:
+        # Інакше - такий самий файл У МЕНЕ (власник) у цій папці
+        folder = folders.ensure(db, user.id, path)
+        folder_id = folder.id if folder else None
+        target_file = db.query(models.File).filter(
             models.File.display_name == file.filename,
-            models.Permission.user_id == user.id,
-            models.Permission.access_level == "write"
-        ).first()
-
-    # Вибираємо, що будемо оновлювати (пріоритет: мій файл -> розшарений)
-    target_file = existing_my or existing_shared
+            models.File.owner_id == user.id,
+            models.File.folder_id == folder_id,
+            models.File.trashed.is_(False)
+        ).with_for_update().first()
 
     target_storage_name = ""
 
@@ -148,72 +238,123 @@ def upload(file: UploadFile, user: models.User = Depends(get_current_user), db:
             storage_name=target_storage_name,
             uploader_name=user.username,
             editor_name=user.username,
-            owner_id=user.id
+            owner_id=user.id,
+            folder_id=folder_id
         )
         db.add(new_file)
 
     # Фізичний запис файлу (Синхронний, бо функція def, не async)
-    path = os.path.join("storage", target_storage_name)
-    try:
-        with open(path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Оновлюємо розмір після запису
+    target = target_file or new_file
+    with storage.writing(db, target, conflict="File was modified concurrently, retry upload") as intent:
+        # Хеш рахується під час копіювання у сховище; розбіжність з очікуваним - 400 без підміни блоба.
+        # Клієнт хешує під час відправки і шле поле sha256 після файлу (на цей момент форма вже розібрана);
+        # X-Content-SHA256 - для тих, хто знає хеш заздалегідь
+        target.size, target.sha256 = storage.write_blob(intent, file.file, sha256 or x_content_sha256)
         if target_file:
-            target_file.size = os.path.getsize(path)
+            events.notify(db, target_file, "updated")
         else:
-            new_file.size = os.path.getsize(path)
-
-    except Exception as e:
-        print(f"Error writing file: {e}")
-        raise HTTPException(500, "Failed to write file")
-
-    db.commit()
+            events.notify(db, new_file, "uploaded", users={user.id})
     return {"status": "ok"}
 
 @app.delete("/delete/{storage_name}")
 def delete_file(storage_name: str, user: models.User = Depends(get_current_user),
                 db: Session = Depends(database.get_db)):
-    file = db.query(models.File).filter(models.File.storage_name == storage_name).first()
+    file = db.query(models.File).filter(models.File.storage_name == storage_name,
+                                        models.File.trashed.is_(False)).first()
     if not file: raise HTTPException(404, "Not found")
 
-    # 1. Якщо Власник -> Видаляємо повністю
+    # 1. Якщо Власник -> у кошик; блоб фізично видалить фоновий прибиральник (trash.py)
     if file.owner_id == user.id:
-        try:
-            path = os.path.join("storage", file.storage_name)
-            if os.path.exists(path): os.remove(path)
-        except:
-            pass
-        db.delete(file)
+        trash.move_to_trash(db, user, [storage_name])
         db.commit()
-        return {"status": "deleted_completely"}
+        trash.after_commit(db)
+        return {"status": "trashed"}
 
     # 2. Якщо Гість -> Видаляємо тільки право доступу (прибираємо зі списку)
     else:
         perm = db.query(models.Permission).filter_by(file_id=file.id, user_id=user.id).first()
         if perm:
+            events.notify(db, file, "unshared", users={user.id})
             db.delete(perm)
             db.commit()
+            authz.invalidate(file.id)
             return {"status": "removed_permission"}
         else:
             raise HTTPException(403, "Cannot delete file (not owner and no permission found)")
 
 
+@app.post("/delete")
+def delete_files(req: FileNamesRequest, user: models.User = Depends(get_current_user),
+                 db: Session = Depends(database.get_db)):
+    """Масове видалення власних файлів у кошик. Чужі імена пропускаються."""
+    count = trash.move_to_trash(db, user, req.storage_names)
+    db.commit()
+    trash.after_commit(db)
+    return {"status": "trashed", "count": count}
+
+
+# --- КОШИК ---
+@app.get("/trash", response_model=TrashListing)
+def list_trash(cursor: int = 0, limit: int = 500, user: models.User = Depends(get_current_user),
+               db: Session = Depends(database.get_db)):
+    limit = max(1, min(limit, 5000))
+    files = db.query(models.File).options(joinedload(models.File.folder)).filter(
+        models.File.owner_id == user.id, models.File.trashed.is_(True),
+        models.File.deleted_at > trash.PURGE_NOW, models.File.id > cursor) \
+        .order_by(models.File.id).limit(limit + 1).all()
+    next_cursor = files[limit - 1].id if len(files) > limit else None
+    return {"files": [file_out(f, "owner") for f in files[:limit]], "next_cursor": next_cursor}
+
+
+@app.post("/trash/restore")
+def restore_files(req: FileNamesRequest, user: models.User = Depends(get_current_user),
+                  db: Session = Depends(database.get_db)):
+    """Повертає файли з кошика. Якщо ім'я вже зайняте, відновлений файл отримує суфікс ' (2)'."""
+    count = trash.restore(db, user, req.storage_names)
+    db.commit()
+    authz.invalidate()
+    return {"status": "restored", "count": count}
+
+
+@app.post("/trash/purge")
+def purge_trash(req: Optional[FileNamesRequest] = None, user: models.User = Depends(get_current_user),
+                db: Session = Depends(database.get_db)):
+    """Остаточне видалення вибраних файлів (або всього кошика без тіла). Виконує прибиральник у фоні."""
+    count = trash.schedule_purge(db, user, req.storage_names if req else None)
+    db.commit()
+    return {"status": "scheduled", "count": count}
+
+
 @app.post("/share")
 def share(req: ShareRequest, user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
-    file = db.query(models.File).filter_by(display_name=req.filename, owner_id=user.id).first()
+    file = db.query(models.File).filter_by(storage_name=req.storage_name, owner_id=user.id, trashed=False).first()
     if not file: raise HTTPException(404, "File not found or not owner")
 
-    target = db.query(models.User).filter_by(username=req.target_user).first()
-    if not target: raise HTTPException(404, "User not found")
+    if req.level not in ("read", "write"): raise HTTPException(400, "Level must be read or write")
 
-    existing_perm = db.query(models.Permission).filter_by(file_id=file.id, user_id=target.id).first()
-    if existing_perm:
-        existing_perm.access_level = req.level
+    if req.target_group:
+        group = db.query(models.Group).filter_by(name=req.target_group).first()
+        if not group: raise HTTPException(404, "Group not found")
+        existing_perm = db.query(models.GroupPermission).filter_by(file_id=file.id, group_id=group.id).first()
+        if existing_perm:
+            existing_perm.access_level = req.level
+        else:
+            db.add(models.GroupPermission(group_id=group.id, file_id=file.id, access_level=req.level))
+        notified = {user.id} | {m.user_id for m in group.members}
     else:
-        db.add(models.Permission(user_id=target.id, file_id=file.id, access_level=req.level))
+        target = db.query(models.User).filter_by(username=req.target_user).first()
+        if not target: raise HTTPException(404, "User not found")
+
+        existing_perm = db.query(models.Permission).filter_by(file_id=file.id, user_id=target.id).first()
+        if existing_perm:
+            existing_perm.access_level = req.level
+        else:
+            db.add(models.Permission(user_id=target.id, file_id=file.id, access_level=req.level))
+        notified = {user.id, target.id}
 
+    events.notify(db, file, "shared", users=notified)
     db.commit()
+    authz.invalidate(file.id)
     return {"status": "shared"}
 
 
@@ -221,31 +362,291 @@ def share(req: ShareRequest, user: models.User = Depends(get_current_user), db:
 @app.post("/update_content")
 def update_content(req: UpdateContentRequest, user: models.User = Depends(get_current_user),
                    db: Session = Depends(database.get_db)):
-    file = db.query(models.File).filter(models.File.storage_name == req.storage_name).first()
+    file = db.query(models.File).filter(models.File.storage_name == req.storage_name).with_for_update().first()
     if not file: raise HTTPException(404, "Not found")
 
     # Перевірка прав (Owner або Write)
-    has_access = False
-    if file.owner_id == user.id:
-        has_access = True
+    authz.require(db, user, file, "write")
+    if req.version is not None and req.version != file.version:
+        raise HTTPException(409, "File was changed by someone else, reload it")
+
+    # Зберігаємо файл
+    with storage.writing(db, file) as intent:
+        size, digest = storage.write_blob(intent, io.BytesIO(req.content.encode("utf-8")))
+
+        # Оновлюємо метадані
+        file.editor_name = user.username
+        file.updated_at = datetime.now()
+        file.size = size
+        file.sha256 = digest
+        events.notify(db, file, "updated")
+    return {"status": "updated", "version": file.version, "sha256": file.sha256}
+
+
+# --- ЗАВАНТАЖЕННЯ ---
+def serve_blob(storage_name, request, headers=None):
+    if storage_name.startswith("."): raise HTTPException(404)
+    path = storage.blob_path(storage_name)
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise HTTPException(404)
+    if not stat.S_ISREG(st.st_mode): raise HTTPException(404)
+
+    if request.headers.get("if-none-match") == etag_for(st):
+        return Response(status_code=304, headers={**(headers or {}), "etag": etag_for(st)})
+    return BlobResponse(path, st, request.headers.get("range"), headers=headers, method=request.method)
+
+
+@app.api_route("/raw/{storage_name}", methods=["GET", "HEAD"])
+def raw_file(storage_name: str, request: Request, user: models.User = Depends(get_user_header_or_ticket),
+             db: Session = Depends(database.get_db)):
+    file = db.query(models.File).filter(models.File.storage_name == storage_name).first()
+    if not file: raise HTTPException(404)
+    authz.require(db, user, file, "read")
+    db.close()
+    return serve_blob(storage_name, request, headers={"cache-control": "private, no-cache"})
+
+
+@app.post("/download_url")
+def download_url(req: DownloadUrlRequest, user: models.User = Depends(get_current_user)):
+    """Адреса з квитком на кілька хвилин; права перевіряються вже при самому скачуванні."""
+    if req.storage_name:
+        path, params = f"/raw/{req.storage_name}", []
     else:
-        perm = db.query(models.Permission).filter_by(file_id=file.id, user_id=user.id).first()
-        if perm and perm.access_level == "write": has_access = True
+        path = "/archive"
+        params = [("names", n) for n in req.names] + ([("folder", req.folder)] if req.folder else [])
+    ticket = links.sign_ticket(user.id, ticket_subject(path, params))
+    return {"url": f"{quote(path)}?{urlencode(params + [('ticket', ticket)])}"}
 
-    if not has_access: raise HTTPException(403, "Read only access")
 
-    # Зберігаємо файл
-    path = os.path.join("storage", file.storage_name)
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(req.content)
+# --- ПУБЛІЧНІ ПОСИЛАННЯ ---
+@app.api_route("/s/{token}", methods=["GET", "HEAD"])
+def public_link(token: str, request: Request):
+    """Без входу і без БД: підпис, термін і список відкликаних перевіряються в пам'яті."""
+    link_id, storage_name, expires = links.verify(token)
+    response = serve_blob(storage_name, request, headers=links.cache_headers(storage_name, expires))
+    if response.status_code == 200 and request.method == "GET":
+        links.record_download(link_id)
+    return response
+
+
+def link_out(link):
+    expires = int(link.expires_at.timestamp())
+    token = links.sign(link.id, link.file.storage_name, expires)
+    return {"id": link.id, "filename": link.file.display_name, "storage_name": link.file.storage_name,
+            "url": f"/s/{token}", "expires_at": link.expires_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "revoked": link.revoked, "downloads": link.downloads}
 
-    # Оновлюємо метадані
-    file.editor_name = user.username
-    file.updated_at = datetime.now()
-    file.size = os.path.getsize(path)
 
+@app.post("/links")
+def create_link(req: LinkRequest, user: models.User = Depends(get_current_user),
+                db: Session = Depends(database.get_db)):
+    file = db.query(models.File).filter(models.File.storage_name == req.storage_name).first()
+    if not file: raise HTTPException(404, "Not found")
+    authz.require(db, user, file, "owner")
+    if not 1 <= req.hours <= links.MAX_TTL_HOURS:
+        raise HTTPException(400, f"Hours must be between 1 and {links.MAX_TTL_HOURS}")
+
+    # Без мікросекунд: з рядка в БД відтворюється той самий токен
+    expires = int(datetime.now().timestamp()) + req.hours * 3600
+    link = models.ShareLink(file=file, created_by=user.id, expires_at=datetime.fromtimestamp(expires))
+    db.add(link)
     db.commit()
-    return {"status": "updated"}
+    return link_out(link)
+
+
+@app.get("/links")
+def list_links(storage_name: Optional[str] = None, user: models.User = Depends(get_current_user),
+               db: Session = Depends(database.get_db)):
+    """Живі посилання на мої файли. Лічильник скачувань відстає на FLUSH_SEC."""
+    links.flush()
+    q = db.query(models.ShareLink).join(models.File).options(joinedload(models.ShareLink.file)).filter(
+        models.File.owner_id == user.id, models.ShareLink.expires_at > datetime.now())
+    if storage_name:
+        q = q.filter(models.File.storage_name == storage_name)
+    return [link_out(link) for link in q.order_by(models.ShareLink.id)]
+
+
+@app.delete("/links/{link_id}")
+def revoke_link(link_id: int, user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
+    link = db.get(models.ShareLink, link_id)
+    if not link or link.file.owner_id != user.id: raise HTTPException(404, "Link not found")
+    link.revoked = True
+    db.commit()
+    links.revoke(link.id)
+    return {"status": "revoked"}
+
+
+@app.get("/archive")
+def download_archive(names: List[str] = Query([]), folder: Optional[str] = None,
+                     user: models.User = Depends(get_user_header_or_ticket), db: Session = Depends(database.get_db)):
+    """ZIP з вибраних файлів (names=storage_name, кілька разів) та/або цілої папки власника."""
+    entries = []
+    if names:
+        files = db.query(models.File).filter(models.File.storage_name.in_(names), models.File.trashed.is_(False)).all()
+        levels = authz.resolve_many(db, user, files)
+        entries += [(f.display_name, f.storage_name) for f in files if levels[f.id]]
+    if folder is not None:
+        base = folders.resolve(db, user.id, folder)
+        prefix = base.path if base else folders.ROOT
+        q = db.query(models.File).options(joinedload(models.File.folder)).filter(
+            models.File.owner_id == user.id, models.File.trashed.is_(False))
+        if base:
+            q = q.join(models.Folder).filter(models.Folder.path.startswith(prefix, autoescape=True))
+        for f in q.yield_per(1000):
+            entries.append((folders.path_of(f)[len(prefix):] + f.display_name, f.storage_name))
+    if not entries: raise HTTPException(404, "Nothing to download")
+
+    # Метадані вже зібрані - звільняємо з'єднання з БД до початку довгої віддачі
+    db.close()
+    archive_name = "drive.zip"
+    if folder not in (None, folders.ROOT):
+        archive_name = folders.normalize(folder).strip("/").split("/")[-1] + ".zip"
+    return StreamingResponse(archive.stream_zip(archive.unique_names(entries)), media_type="application/zip",
+                             headers={"Content-Disposition": content_disposition(archive_name)})
+
+
+# --- ГРУПИ ---
+@app.post("/groups")
+def create_group(req: GroupRequest, user: models.User = Depends(get_current_user),
+                 db: Session = Depends(database.get_db)):
+    if db.query(models.Group).filter_by(name=req.name).first():
+        raise HTTPException(400, "Group exists")
+    group = models.Group(name=req.name, owner_id=user.id)
+    group.members.append(models.GroupMember(user_id=user.id))
+    db.add(group)
+    db.commit()
+    return {"status": "created"}
+
+
+def owned_group(db, name, user):
+    group = db.query(models.Group).filter_by(name=name).first()
+    if not group: raise HTTPException(404, "Group not found")
+    if group.owner_id != user.id: raise HTTPException(403, "Only group owner can change members")
+    return group
+
+
+@app.post("/groups/{name}/members")
+def add_group_member(name: str, req: GroupMemberRequest, user: models.User = Depends(get_current_user),
+                     db: Session = Depends(database.get_db)):
+    group = owned_group(db, name, user)
+    member = db.query(models.User).filter_by(username=req.username).first()
+    if not member: raise HTTPException(404, "User not found")
+    if not db.query(models.GroupMember).filter_by(group_id=group.id, user_id=member.id).first():
+        db.add(models.GroupMember(group_id=group.id, user_id=member.id))
+        db.commit()
+        authz.invalidate()
+    return {"status": "added"}
+
+
+@app.delete("/groups/{name}/members/{username}")
+def remove_group_member(name: str, username: str, user: models.User = Depends(get_current_user),
+                        db: Session = Depends(database.get_db)):
+    group = owned_group(db, name, user)
+    member = db.query(models.User).filter_by(username=username).first()
+    if member:
+        db.query(models.GroupMember).filter_by(group_id=group.id, user_id=member.id).delete()
+        db.commit()
+        authz.invalidate()
+    return {"status": "removed"}
+
+
+# --- PUSH-СПОВІЩЕННЯ ---
+@app.get("/events")
+async def event_stream(token: Optional[str] = None, cursor: Optional[int] = None,
+                       last_event_id: Optional[str] = Header(None), authorization: Optional[str] = Header(None)):
+    """
+    Server-Sent Events. EventSource не вміє слати заголовки, тому токен можна передати в ?token=.
+    При перепідключенні браузер сам шле Last-Event-ID - догоняємо пропущене з журналу.
+    """
+    if not token and authorization and authorization.startswith("Bearer "):
+        token = authorization[len("Bearer "):]
+    if not token: raise HTTPException(401)
+
+    def load_user():
+        with database.SessionLocal() as db:
+            return user_from_token(token, db).id
+    user_id = await run_in_threadpool(load_user)
+
+    if last_event_id and last_event_id.isdigit():
+        cursor = int(last_event_id)
+    return StreamingResponse(events.hub.stream(user_id, cursor), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# --- ПАПКИ ---
+@app.post("/folders")
+def create_folder(req: FolderRequest, user: models.User = Depends(get_current_user),
+                  db: Session = Depends(database.get_db)):
+    folder = folders.ensure(db, user.id, req.path)
+    db.commit()
+    return {"path": folder.path if folder else folders.ROOT}
+
+
+@app.get("/folders/list", response_model=FolderListing)
+def list_folder(path: str = folders.ROOT, recursive: bool = False, cursor: int = 0, limit: int = 500,
+                user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
+    """Вміст папки власника. Файли посторінково за id (keyset), підпапки - на першій сторінці."""
+    folder = folders.resolve(db, user.id, path)
+    prefix = folder.path if folder else folders.ROOT
+    limit = max(1, min(limit, 5000))
+
+    q = db.query(models.File).options(joinedload(models.File.folder)).filter(
+        models.File.owner_id == user.id, models.File.trashed.is_(False), models.File.id > cursor)
+    if recursive:
+        if folder:
+            q = q.join(models.Folder).filter(models.Folder.path.startswith(prefix, autoescape=True))
+    else:
+        q = q.filter(models.File.folder_id == (folder.id if folder else None))
+    files = q.order_by(models.File.id).limit(limit + 1).all()
+
+    sub_paths = []
+    if not cursor:
+        fq = db.query(models.Folder.path).filter(models.Folder.owner_id == user.id)
+        if recursive:
+            fq = fq.filter(models.Folder.path.startswith(prefix, autoescape=True), models.Folder.path != prefix)
+        else:
+            fq = fq.filter(models.Folder.parent_id == (folder.id if folder else None))
+        sub_paths = [p for (p,) in fq.order_by(models.Folder.path)]
+
+    next_cursor = files[limit - 1].id if len(files) > limit else None
+    return {"path": prefix, "folders": sub_paths,
+            "files": [file_out(f, "owner") for f in files[:limit]], "next_cursor": next_cursor}
+
+
+@app.post("/folders/move")
+def move_folder(req: MoveFolderRequest, user: models.User = Depends(get_current_user),
+                db: Session = Depends(database.get_db)):
+    folder = folders.resolve(db, user.id, req.src)
+    if folder is None: raise HTTPException(400, "Cannot move root")
+    folders.move(db, folder, req.dst)
+    db.commit()
+    return {"status": "moved", "path": folders.normalize(req.dst)}
+
+
+# --- Оновлення фрагмента (великі файли в редакторі) ---
+@app.patch("/content/{storage_name}")
+def update_range(storage_name: str, offset: int, length: int, version: Optional[int] = None,
+                 data: bytes = Body(b"", media_type="application/octet-stream"),
+                 user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
+    """Замінює байти [offset, offset + length) тілом запиту. Решта файлу не передається."""
+    file = db.query(models.File).filter(models.File.storage_name == storage_name).with_for_update().first()
+    if not file: raise HTTPException(404, "Not found")
+    authz.require(db, user, file, "write")
+    if version is not None and version != file.version:
+        raise HTTPException(409, "File was changed by someone else, reload it")
+    if offset < 0 or length < 0 or offset + length > file.size:
+        raise HTTPException(416, "Range outside of file")
+
+    with storage.writing(db, file) as intent:
+        size, digest = storage.write_range(intent, offset, length, data)
+        file.editor_name = user.username
+        file.updated_at = datetime.now()
+        file.size = size
+        file.sha256 = digest
+        events.notify(db, file, "updated")
+    return {"status": "updated", "version": file.version, "size": size, "sha256": file.sha256}
 
 
 @app.get("/")
@@ -256,4 +657,12 @@ def serve_web(request: Request):
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    # WORKERS=4 python main.py - кілька процесів над спільною БД і STORAGE_DIR.
+    # Стан між запитами живе тільки в БД і сховищі, тож вузли можна множити за балансувальником.
+    workers = int(os.getenv("WORKERS", "1"))
+    host = os.getenv("HOST", "127.0.0.1")
+    port = int(os.getenv("PORT", "8000"))
+    if workers > 1:
+        uvicorn.run("main:app", host=host, port=port, workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
\ No newline at end of file
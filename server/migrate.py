@@ -0,0 +1,68 @@
+"""
+Оновлення схеми існуючої БД до поточних моделей.
+
+create_all створює лише відсутні таблиці, а нові колонки й індекси в уже наявних таблицях
+(files.folder_id, sha256, trashed, version тощо) не додає. upgrade() доповнює їх через
+ALTER TABLE ... ADD COLUMN і CREATE INDEX; безпечно викликати при кожному старті.
+
+Окремо (з папки server, з тим самим DATABASE_URL, що й сервер):
+    python migrate.py
+"""
+from sqlalchemy import inspect, literal, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex
+
+import models, database
+
+
+def _column_sql(column, dialect):
+    sql = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        sql += " DEFAULT " + str(literal(default, column.type).compile(
+            dialect=dialect, compile_kwargs={"literal_binds": True}))
+    # NOT NULL без значення за замовчуванням не додати до таблиці з рядками
+    if not column.nullable and default is not None:
+        sql += " NOT NULL"
+    return sql
+
+
+def _apply(engine, sql, done):
+    """Кожна зміна - окрема транзакція: воркери стартують одночасно, і хтось може встигнути першим."""
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(sql))
+    except DBAPIError:
+        if not done(): raise
+
+
+def upgrade(engine=database.engine):
+    """Повертає список виконаних змін (порожній - схема вже актуальна)."""
+    models.Base.metadata.create_all(bind=engine)
+    changes = []
+    for table in models.Base.metadata.sorted_tables:
+        def columns():
+            return {c["name"] for c in inspect(engine).get_columns(table.name)}
+
+        def indexes():
+            return {i["name"] for i in inspect(engine).get_indexes(table.name)}
+
+        existing = columns()
+        for column in table.columns:
+            if column.name in existing: continue
+            sql = f"ALTER TABLE {table.name} ADD COLUMN {_column_sql(column, engine.dialect)}"
+            _apply(engine, sql, lambda: column.name in columns())
+            changes.append(sql)
+        existing = indexes()
+        for index in table.indexes:
+            if index.name in existing: continue
+            sql = str(CreateIndex(index).compile(dialect=engine.dialect))
+            _apply(engine, sql, lambda: index.name in indexes())
+            changes.append(sql)
+    return changes
+
+
+if __name__ == "__main__":
+    for change in upgrade():
+        print(change)
+    print("Schema is up to date")
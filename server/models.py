@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -11,6 +11,7 @@ class User(Base):
     hashed_password = Column(String)
 
     files = relationship("File", back_populates="owner")
+    folders = relationship("Folder", back_populates="owner")
     permissions = relationship("Permission", back_populates="user")
 
 
@@ -21,6 +22,7 @@ class File(Base):
     extension = Column(String)
     size = Column(Integer)
     storage_name = Column(String, unique=True)  # UUID ім'я на диску
+    sha256 = Column(String(64), nullable=True)  # рахується сервером під час запису блоба
 
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -32,15 +34,123 @@ class File(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="files")
 
+    folder_id = Column(Integer, ForeignKey("folders.id"), nullable=True)  # None = корінь
+    folder = relationship("Folder", back_populates="files")
+
     permissions = relationship("Permission", back_populates="file", cascade="all, delete-orphan")
+    group_permissions = relationship("GroupPermission", back_populates="file", cascade="all, delete-orphan")
+    share_links = relationship("ShareLink", back_populates="file", cascade="all, delete-orphan")
+
+    # Кошик: файл прихований зі списків, блоб фізично видаляє фоновий прибиральник (trash.py)
+    trashed = Column(Boolean, default=False, nullable=False, index=True)
+    deleted_at = Column(DateTime, nullable=True, index=True)
+
+    # Оптимістичне блокування: кожен UPDATE перевіряє версію, конкурентний запис отримає StaleDataError
+    version = Column(Integer, nullable=False, default=1)
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (Index("ix_files_owner_folder_name", "owner_id", "folder_id", "display_name"),)
+
+
+class Folder(Base):
+    __tablename__ = "folders"
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    parent_id = Column(Integer, ForeignKey("folders.id"), nullable=True, index=True)
+    name = Column(String)
+    path = Column(String)  # матеріалізований шлях '/a/b/' - пошук і піддерева по префіксу
+
+    owner = relationship("User", back_populates="folders")
+    files = relationship("File", back_populates="folder")
+
+    __table_args__ = (UniqueConstraint("owner_id", "path", name="uq_folders_owner_path"),)
 
 
 class Permission(Base):
     __tablename__ = "permissions"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    file_id = Column(Integer, ForeignKey("files.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    file_id = Column(Integer, ForeignKey("files.id"), index=True)
     access_level = Column(String)  # 'read' або 'write'
 
     user = relationship("User", back_populates="permissions")
-    file = relationship("File", back_populates="permissions")
\ No newline at end of file
+    file = relationship("File", back_populates="permissions")
+
+class WriteIntent(Base):
+    """Журнал незавершених записів блобів (write-ahead intent)."""
+    __tablename__ = "write_intents"
+    id = Column(Integer, primary_key=True, index=True)
+    storage_name = Column(String, index=True)
+    created_at = Column(DateTime, default=datetime.now, index=True)
+    # Що описували метадані до запису: .old повертаємо, лише якщо файл досі в цьому стані
+    base_version = Column(Integer, nullable=True)
+    base_sha256 = Column(String(64), nullable=True)
+    owner = Column(String, nullable=True)  # leases.process_id() - мертвого власника відновлюємо одразу
+
+
+class Event(Base):
+    """Журнал змін для push-сповіщень. id - курсор, з якого клієнт продовжує після перепідключення."""
+    __tablename__ = "events"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    kind = Column(String)  # 'uploaded', 'updated', 'deleted', 'restored', 'shared', 'unshared'
+    storage_name = Column(String)
+    filename = Column(String)
+    created_at = Column(DateTime, default=datetime.now, index=True)
+
+    __table_args__ = (Index("ix_events_user_id_id", "user_id", "id"),)
+
+
+class Group(Base):
+    """Команда: один рядок GroupPermission дає доступ усім учасникам."""
+    __tablename__ = "groups"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+
+    members = relationship("GroupMember", back_populates="group", cascade="all, delete-orphan")
+    permissions = relationship("GroupPermission", back_populates="group", cascade="all, delete-orphan")
+
+
+class GroupMember(Base):
+    __tablename__ = "group_members"
+    id = Column(Integer, primary_key=True, index=True)
+    group_id = Column(Integer, ForeignKey("groups.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+
+    group = relationship("Group", back_populates="members")
+
+    __table_args__ = (UniqueConstraint("group_id", "user_id", name="uq_group_members"),)
+
+
+class GroupPermission(Base):
+    __tablename__ = "group_permissions"
+    id = Column(Integer, primary_key=True, index=True)
+    group_id = Column(Integer, ForeignKey("groups.id"))
+    file_id = Column(Integer, ForeignKey("files.id"), index=True)
+    access_level = Column(String)  # 'read' або 'write'
+
+    group = relationship("Group", back_populates="permissions")
+    file = relationship("File", back_populates="group_permissions")
+
+
+class ShareLink(Base):
+    """Публічне посилання. Сам токен підписаний і перевіряється без БД, рядок - для відкликання і лічильника."""
+    __tablename__ = "share_links"
+    id = Column(Integer, primary_key=True, index=True)
+    file_id = Column(Integer, ForeignKey("files.id"), index=True)
+    created_by = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.now)
+    expires_at = Column(DateTime, index=True)
+    revoked = Column(Boolean, default=False, nullable=False)
+    downloads = Column(Integer, default=0, nullable=False)
+
+    file = relationship("File", back_populates="share_links")
+
+
+class Lease(Base):
+    """Оренда фонової роботи: з усіх процесів і вузлів її виконує лише той, хто тримає рядок."""
+    __tablename__ = "leases"
+    name = Column(String, primary_key=True)
+    holder = Column(String)
+    expires_at = Column(DateTime)
@@ -0,0 +1,115 @@
+import mmap
+import re
+from email.utils import formatdate
+from urllib.parse import quote
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+CHUNK_SIZE = 1024 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_UNSAFE_ASCII_RE = re.compile(r'[^\x20-\x7e]|["\\]')
+
+
+def content_disposition(filename, kind="attachment"):
+    """
+    Заголовки мають бути latin-1, тому ім'я передаємо у filename* (RFC 6266/5987),
+    а filename - ASCII-запасний варіант для старих клієнтів, без лапок і не-ASCII символів.
+    """
+    fallback = _UNSAFE_ASCII_RE.sub("_", filename)
+    return f"{kind}; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def parse_range(header, size):
+    """'bytes=a-b' / 'bytes=a-' / 'bytes=-n' -> (start, end) включно. None - весь файл, ValueError - 416."""
+    if not header: return None
+    m = _RANGE_RE.match(header.strip())
+    if not m: raise ValueError(header)  # кілька діапазонів не підтримуємо
+    first, last = m.groups()
+    if first == "":
+        if not last or int(last) == 0: raise ValueError(header)
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end: raise ValueError(header)
+    return start, end
+
+
+class BlobResponse(Response):
+    """
+    Віддача блоба з локального сховища.
+    * Якщо сервер підтримує ASGI-розширення http.response.zerocopy - ядро шле файл само (sendfile).
+    * Запити з Range читаються через mmap з попереднім madvise(WILLNEED), без зайвих read().
+    * Інакше - великими чанками в пулі потоків, пам'ять постійна незалежно від розміру файлу.
+    """
+
+    def __init__(self, path, stat_result, range_header=None, headers=None, method="GET"):
+        super().__init__(status_code=200, headers=headers)
+        self.path = path
+        self.size = stat_result.st_size
+        self.send_body = method != "HEAD"
+        self.start, self.end = 0, self.size - 1
+        self.is_range = False
+
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["etag"] = etag_for(stat_result)
+        self.headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+        self.headers.setdefault("content-type", "application/octet-stream")
+
+        try:
+            rng = parse_range(range_header, self.size)
+        except ValueError:
+            self.status_code = 416
+            self.headers["content-range"] = f"bytes */{self.size}"
+            self.headers["content-length"] = "0"
+            self.send_body = False
+            return
+        if rng:
+            self.status_code = 206
+            self.start, self.end = rng
+            self.headers["content-range"] = f"bytes {self.start}-{self.end}/{self.size}"
+        self.headers["content-length"] = str(self.end - self.start + 1 if self.size else 0)
+        self.is_range = rng is not None
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if not self.send_body or self.size == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopy", "file": f, "offset": self.start, "count": count})
+            elif self.is_range:
+                await self._send_mmap(f, count, send)
+            else:
+                await self._send_chunks(f, count, send)
+
+    async def _send_mmap(self, f, count, send):
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+                page = self.start - self.start % mmap.PAGESIZE
+                mm.madvise(mmap.MADV_WILLNEED, page, self.end + 1 - page)
+            pos, end = self.start, self.end + 1
+            while pos < end:
+                stop = min(pos + CHUNK_SIZE, end)
+                chunk = await run_in_threadpool(mm.__getitem__, slice(pos, stop))
+                pos = stop
+                await send({"type": "http.response.body", "body": chunk, "more_body": pos < end})
+        finally:
+            mm.close()
+
+    async def _send_chunks(self, f, count, send):
+        remaining = count
+        while remaining > 0:
+            chunk = await run_in_threadpool(f.read, min(CHUNK_SIZE, remaining))
+            if not chunk: break
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+
+
+def etag_for(stat_result):
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
@@ -4,6 +4,9 @@ let currentUser = "";
 let allFiles = [];
 let isLoginMode = true;
 let selectedFileObject = null;
+let selectedFiles = [];
+let eventSource = null;
+let reloadTimer = null;
 
 //AUTH
 function toggleAuthMode() {
@@ -39,6 +42,7 @@ async function login() {
 }
 
 function logout() {
+    if (eventSource) eventSource.close();
     token = "";
     localStorage.removeItem('jwt_token');
     location.reload();
@@ -49,6 +53,27 @@ function showApp() {
     document.getElementById('app-box').style.display = 'flex';
     document.getElementById('username-display').innerText = currentUser;
     loadFiles();
+    subscribeEvents();
+}
+
+//PUSH
+function subscribeEvents() {
+    if (eventSource) eventSource.close();
+    // EventSource сам перепідключається і шле Last-Event-ID, сервер догонить пропущене
+    eventSource = new EventSource(`/events?token=${encodeURIComponent(token)}`);
+    ['uploaded', 'updated', 'deleted', 'restored', 'shared', 'unshared'].forEach(kind => {
+        eventSource.addEventListener(kind, scheduleReload);
+    });
+}
+
+function scheduleReload() {
+    clearTimeout(reloadTimer);
+    reloadTimer = setTimeout(() => {
+        // Не затираємо незбережені правки в редакторі
+        const btnSave = document.getElementById('btn-save');
+        if (btnSave && btnSave.style.display !== 'none') { scheduleReload(); return; }
+        loadFiles();
+    }, 300);
 }
 
 //DATA & UI
@@ -77,6 +102,7 @@ function renderTable(data) {
 
     // Скидання стану
     selectedFileObject = null;
+    selectedFiles = [];
     document.querySelectorAll('.action-btn').forEach(b => b.style.display = 'none');
     document.getElementById('preview-content').innerHTML = "Select a file...";
 
@@ -89,7 +115,7 @@ function renderTable(data) {
         if (f.access_type !== 'owner') tr.classList.add('shared');
 
         tr.innerHTML = `
-            <td>${f.filename} ${f.access_type !== 'owner' ? '🔗' : ''}</td>
+            <td><span style="color:#888;">${f.path && f.path !== '/' ? f.path : ''}</span>${f.filename} ${f.access_type !== 'owner' ? '🔗' : ''}</td>
             <td>${f.extension}</td>
             <td class="opt-col">${f.created_at}</td>
             <td class="opt-col">${f.updated_at}</td>
@@ -97,16 +123,26 @@ function renderTable(data) {
             <td class="opt-col">${f.editor}</td>
         `;
 
-        tr.onclick = () => {
+        tr.onclick = (e) => {
+            // Ctrl/Cmd + клік - мультивибір для скачування архівом
+            if (e.ctrlKey || e.metaKey) {
+                tr.classList.toggle('selected');
+                selectedFiles = tr.classList.contains('selected')
+                    ? [...selectedFiles, f] : selectedFiles.filter(x => x !== f);
+                document.getElementById('btn-dl').style.display = selectedFiles.length ? 'inline-block' : 'none';
+                return;
+            }
             document.querySelectorAll('tr').forEach(r => r.classList.remove('selected'));
             tr.classList.add('selected');
             selectedFileObject = f;
+            selectedFiles = [f];
 
             document.getElementById('btn-dl').style.display = 'inline-block';
             document.getElementById('btn-del').style.display = 'inline-block';
 
             if (f.access_type === 'owner') {
                 document.getElementById('btn-share').style.display = 'inline-block';
+                document.getElementById('btn-link').style.display = 'inline-block';
                 document.getElementById('btn-del').innerText = "🗑 Delete File";
             } else {
                 document.getElementById('btn-share').style.display = 'none';
@@ -135,17 +171,22 @@ async function previewFile(file) {
     if(btnSave) btnSave.style.display = 'none';
 
     const fileUrl = `/raw/${file.storage_name}`;
-    // Генеруємо мітку часу для обходу кешу
-    const timestamp = new Date().getTime();
+    // Токен - лише в заголовку; /raw віддає Cache-Control: no-cache, тож ETag перевіряється щоразу
+    const authHeaders = {'Authorization': `Bearer ${token}`};
 
     if (file.extension === '.png') {
-        // Додаємо timestamp до картинки
-        container.innerHTML = `<img src="${fileUrl}?t=${timestamp}" style="max-width: 100%; border: 1px solid #555;">`;
+        try {
+            // <img> не шле заголовків - тягнемо вміст fetch-ем і показуємо через blob: URL
+            const res = await fetch(fileUrl, {headers: authHeaders});
+            if (!res.ok) throw new Error(res.status);
+            const src = URL.createObjectURL(await res.blob());
+            container.innerHTML = `<img src="${src}" style="max-width: 100%; border: 1px solid #555;">`;
+            container.querySelector('img').onload = () => URL.revokeObjectURL(src);
+        } catch(e) { container.innerHTML = "Error loading image"; }
 
     } else if (file.extension === '.js') {
         try {
-            // Додаємо timestamp до fetch запиту
-            const res = await fetch(`${fileUrl}?t=${timestamp}`);
+            const res = await fetch(fileUrl, {headers: authHeaders});
             let text = await res.text();
 
             const canEdit = (file.access_type === 'owner' || file.access_type === 'write');
@@ -187,7 +228,8 @@ async function saveContent() {
         },
         body: JSON.stringify({
             storage_name: selectedFileObject.storage_name,
-            content: newText
+            content: newText,
+            version: selectedFileObject.version
         })
     });
 
@@ -195,6 +237,8 @@ async function saveContent() {
         alert("Saved!");
         document.getElementById('btn-save').style.display = 'none'; // Ховаємо кнопку після успішного збереження
         loadFiles();
+    } else if (res.status === 409) {
+        alert("File was changed by someone else. Refresh and try again.");
     } else {
         alert("Error saving content");
     }
@@ -205,6 +249,10 @@ async function upload(file) {
 
     const fd = new FormData();
     fd.append("file", file);
+    // Файл з тим самим ім'ям, вибраний у списку і доступний на запис, оновлюємо саме його
+    const sel = selectedFileObject;
+    if (sel && sel.filename === file.name && (sel.access_type === 'owner' || sel.access_type === 'write'))
+        fd.append("storage_name", sel.storage_name);
 
     try {
         const res = await fetch('/upload', {
@@ -227,9 +275,26 @@ async function upload(file) {
     }
 }
 
+// Браузер качає сам (одразу на диск), але заголовок додати не може: беремо адресу
+// з короткоживучим квитком лише на цей файл чи архів, а не з JWT
+async function downloadUrl(body) {
+    const res = await fetch('/download_url', {
+        method: 'POST',
+        headers: {'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json'},
+        body: JSON.stringify(body)
+    });
+    if (!res.ok) throw new Error(res.status);
+    return (await res.json()).url;
+}
+
 async function downloadFile() {
+    if (selectedFiles.length > 1) {
+        // Браузер пише ZIP-потік одразу на диск
+        window.location = await downloadUrl({names: selectedFiles.map(f => f.storage_name)});
+        return;
+    }
     if (!selectedFileObject) return;
-    const url = `/raw/${selectedFileObject.storage_name}`;
+    const url = await downloadUrl({storage_name: selectedFileObject.storage_name});
 
     const a = document.createElement('a');
     a.href = url;
@@ -242,7 +307,7 @@ async function downloadFile() {
 async function deleteFile() {
     if (!selectedFileObject) return;
     const msg = selectedFileObject.access_type === 'owner' ?
-        `Delete ${selectedFileObject.filename} permanently?` :
+        `Move ${selectedFileObject.filename} to trash?` :
         `Remove access to ${selectedFileObject.filename}?`;
 
     if (!confirm(msg)) return;
@@ -269,12 +334,30 @@ async function shareFile() {
         await fetch('/share', {
             method: 'POST',
             headers: {'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json'},
-            body: JSON.stringify({filename: selectedFileObject.filename, target_user: user, level})
+            body: JSON.stringify({storage_name: selectedFileObject.storage_name, target_user: user, level})
         });
         alert("Shared!");
     }
 }
 
+async function createLink() {
+    if (!selectedFileObject) return alert("Select a file first");
+
+    const hours = prompt("Link lifetime (hours):", "24");
+    if (!hours) return;
+    const res = await fetch('/links', {
+        method: 'POST',
+        headers: {'Authorization': `Bearer ${token}`, 'Content-Type': 'application/json'},
+        body: JSON.stringify({storage_name: selectedFileObject.storage_name, hours: parseInt(hours)})
+    });
+    if (!res.ok) {
+        const err = await res.json();
+        return alert("Error: " + (err.detail || res.statusText));
+    }
+    const link = await res.json();
+    prompt(`Public link (until ${link.expires_at}):`, location.origin + link.url);
+}
+
 // --- DRAG N DROP ---
 const dropZone = document.getElementById('drop-zone');
 
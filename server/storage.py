@@ -0,0 +1,274 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.orm.exc import StaleDataError
+
+import models, database, leases
+
+# Для кількох вузлів STORAGE_DIR має вказувати на спільне сховище (NFS, змонтований том)
+STORAGE_DIR = os.getenv("STORAGE_DIR", "storage")
+# Тимчасові файли лежать на тій самій ФС, що й блоби, тому os.replace атомарний
+TMP_DIR = os.path.join(STORAGE_DIR, ".tmp")
+CHUNK_SIZE = 1024 * 1024
+
+# Незавершені операції молодші за цей час можуть ще виконуватись на іншому вузлі
+# (живість процесу перевіряється лише на своєму вузлі - див. leases.is_dead)
+RECOVERY_GRACE = timedelta(hours=1)
+RECOVERY_LEASE = "write-recovery"
+RECOVERY_INTERVAL_SEC = 60
+
+_recovery_started = False
+_recovery_lock = threading.Lock()
+
+
+class ChecksumMismatch(ValueError):
+    """Хеш записаного не збігся з тим, що надіслав клієнт."""
+
+
+def ensure_dirs():
+    os.makedirs(STORAGE_DIR, exist_ok=True)
+    os.makedirs(TMP_DIR, exist_ok=True)
+
+
+def blob_path(storage_name):
+    return os.path.join(STORAGE_DIR, storage_name)
+
+
+def tmp_path(intent):
+    return os.path.join(TMP_DIR, f"{intent.id}_{intent.storage_name}")
+
+
+def old_path(intent):
+    """Жорстке посилання на попередній блоб - щоб відкотити підміну, якщо commit не відбувся."""
+    return tmp_path(intent) + ".old"
+
+
+def _fsync_dir(path):
+    # На Windows директорію не можна відкрити для fsync
+    if not hasattr(os, "O_DIRECTORY"): return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def begin_write(storage_name, base_version=None, base_sha256=None):
+    """
+    Фіксує намір запису в окремій транзакції ще до того, як торкнутися диска.
+    base_* - стан файлу, який бачить запит (None для нового файлу).
+    """
+    with database.SessionLocal() as s:
+        intent = models.WriteIntent(storage_name=storage_name, base_version=base_version,
+                                    base_sha256=base_sha256, owner=leases.process_id())
+        s.add(intent)
+        s.commit()
+        s.refresh(intent)
+        s.expunge(intent)
+    return intent
+
+
+def write_blob(intent, src, expected_sha256=None):
+    """
+    Пише потік у тимчасовий файл з fsync; блоб не чіпає - підміна окремо, в publish().
+    Повертає (розмір, sha256). Хеш рахується під час того ж копіювання; якщо він не збігся
+    з expected_sha256, тимчасовий файл видаляється і кидається ChecksumMismatch.
+    """
+    tmp = tmp_path(intent)
+    h = hashlib.sha256()
+    size = 0
+    with open(tmp, "wb") as out:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk: break
+            out.write(chunk)
+            h.update(chunk)
+            size += len(chunk)
+        out.flush()
+        os.fsync(out.fileno())
+    digest = h.hexdigest()
+    if expected_sha256 is not None and expected_sha256.lower() != digest:
+        os.remove(tmp)
+        raise ChecksumMismatch(digest)
+    return size, digest
+
+
+def _copy(src, dst, count, h):
+    while count > 0:
+        chunk = src.read(min(CHUNK_SIZE, count))
+        if not chunk: break
+        dst.write(chunk)
+        h.update(chunk)
+        count -= len(chunk)
+
+
+def write_range(intent, offset, length, data):
+    """
+    Замінює байти [offset, offset + length) на data. Новий блоб збирається в тимчасовому
+    файлі з голови, нових даних і хвоста старого - по мережі йде лише змінений фрагмент.
+    Як і write_blob, тільки готує тимчасовий файл. Повертає (розмір, sha256 нового блоба).
+
+    Копія всього блоба на кожне збереження - свідомо, а не запис на місці: sha256 однаково
+    треба перерахувати по всьому файлу, завантаження, що вже йдуть (mmap/Range), дочитують
+    незмінний знімок, а відкат до commit - це просто повернення .old. Ціна - один послідовний
+    прохід диском (≈ секунди на гігабайт) на збереження, яке робить людина, а не цикл.
+    """
+    tmp = tmp_path(intent)
+    final = blob_path(intent.storage_name)
+    h = hashlib.sha256()
+    with open(final, "rb") as src, open(tmp, "wb") as out:
+        _copy(src, out, offset, h)
+        out.write(data)
+        h.update(data)
+        src.seek(offset + length)
+        _copy(src, out, float("inf"), h)
+        out.flush()
+        os.fsync(out.fileno())
+        size = out.tell()
+    return size, h.hexdigest()
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def publish(intent):
+    """
+    Атомарно підміняє блоб підготовленим тимчасовим файлом. Викликати тільки після того,
+    як db.flush() пройшов перевірку версії: запит, що програв гонку, сюди не доходить.
+    Старий вміст лишається жорстким посиланням (без копіювання) до release().
+    """
+    final = blob_path(intent.storage_name)
+    if os.path.exists(final):
+        os.link(final, old_path(intent))
+    os.replace(tmp_path(intent), final)
+    _fsync_dir(STORAGE_DIR)
+
+
+def finish_write(db, intent):
+    """Знімає намір у тій самій транзакції, що й оновлення метаданих."""
+    db.query(models.WriteIntent).filter_by(id=intent.id).delete()
+
+
+def release(intent):
+    """Після commit попередній вміст уже не потрібен."""
+    try:
+        os.remove(old_path(intent))
+    except FileNotFoundError:
+        pass
+
+
+def abort_write(intent):
+    with database.SessionLocal() as s:
+        row = s.get(models.WriteIntent, intent.id)
+        if row:
+            _resolve(s, row)
+            s.commit()
+
+
+def _resolve(db, intent):
+    """
+    Намір ще в БД - отже commit метаданих не відбувся (намір знімається в тій самій транзакції).
+    Блоб має лишитися таким, яким його бачать закомічені метадані. Але поки намір чекав
+    відновлення, поверх міг закомітитись новіший запис - тоді на місці вже його блоб, і .old
+    (вміст до нашого запису) повертати не можна.
+    """
+    tmp = tmp_path(intent)
+    old = old_path(intent)
+    final = blob_path(intent.storage_name)
+    file = db.query(models.File).filter_by(storage_name=intent.storage_name).first()
+    if os.path.exists(tmp):
+        # Запис не дійшов до rename
+        os.remove(tmp)
+        if os.path.exists(old): os.remove(old)
+    elif os.path.exists(old):
+        unchanged = file is not None and intent.base_version is not None and (
+            file.version == intent.base_version or (intent.base_sha256 and file.sha256 == intent.base_sha256))
+        if unchanged:
+            # Блоб підмінено, а метадані досі описують попередній вміст - повертаємо його
+            os.replace(old, final)
+            _fsync_dir(STORAGE_DIR)
+        else:
+            os.remove(old)
+    elif os.path.exists(final) and file is None:
+        # Новий блоб без метаданих
+        os.remove(final)
+    db.delete(intent)
+
+
+@contextmanager
+def writing(db, file, conflict="File was changed by someone else, reload it"):
+    """
+    Увесь протокол запису блоба в одному місці. Тіло with пише тимчасовий файл
+    (write_blob/write_range через yield-нутий намір) і змінює метадані file в db. Далі:
+      1. db.flush() - UPDATE ... WHERE version=?: запит, що програв гонку, диск не чіпає;
+      2. publish() - атомарна підміна блоба, попередній лишається як .old;
+      3. намір знімається в тій самій транзакції, що й метадані, - commit;
+      4. release() - .old більше не потрібен.
+    Будь-яка помилка до commit відкочує і БД, і блоб; назовні - HTTPException.
+    """
+    intent = begin_write(file.storage_name, file.version, file.sha256)
+    try:
+        yield intent
+        db.flush()
+        publish(intent)
+        finish_write(db, intent)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        abort_write(intent)
+        if isinstance(e, HTTPException): raise
+        if isinstance(e, StaleDataError): raise HTTPException(409, conflict)
+        if isinstance(e, ChecksumMismatch): raise HTTPException(400, "Checksum mismatch, file was corrupted in transit")
+        print(f"Error writing file: {e}")
+        raise HTTPException(500, "Failed to write file")
+    release(intent)
+
+
+def recover(db, grace=RECOVERY_GRACE):
+    """
+    Розбирає завислі наміри: старші за grace або ті, чий процес-власник на цьому вузлі
+    вже завершився (після падіння - одразу, а не через годину). Повертає кількість оброблених.
+    """
+    cutoff = datetime.now() - grace
+    intents = [i for i in db.query(models.WriteIntent).all() if i.created_at < cutoff or leases.is_dead(i.owner)]
+    for intent in intents:
+        _resolve(db, intent)
+    db.commit()
+    return len(intents)
+
+
+def recover_pending():
+    """Відновлення при старті і періодично - в одному процесі на всі вузли, під орендою в БД."""
+    with database.SessionLocal() as db:
+        if db.query(models.WriteIntent.id).first() is None: return 0
+        if not leases.acquire(db, RECOVERY_LEASE): return 0
+        return recover(db)
+
+
+def _run_recovery():
+    while True:
+        try:
+            recovered = recover_pending()
+            if recovered: print(f"Recovered {recovered} interrupted writes")
+        except Exception as e:
+            print(f"Write recovery error: {e}")
+        time.sleep(RECOVERY_INTERVAL_SEC)
+
+
+def start_recovery():
+    """Запускається в кожному воркері, як і прибиральник кошика; перший прохід - одразу."""
+    global _recovery_started
+    with _recovery_lock:
+        if _recovery_started: return
+        _recovery_started = True
+    threading.Thread(target=_run_recovery, name="write-recovery", daemon=True).start()
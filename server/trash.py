@@ -0,0 +1,181 @@
+import os
+import posixpath
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+import models, database, storage, events, authz, links, leases
+
+RETENTION = timedelta(days=int(os.getenv("TRASH_DAYS", "30")))
+# Позначка "видалити при наступному проході прибиральника" (очищення кошика вручну)
+PURGE_NOW = datetime(1970, 1, 1)
+BATCH = 500                  # скільки імен в одному IN (...)
+PURGE_BATCH = 1000           # рядків за одну транзакцію прибиральника
+PURGE_RATE = int(os.getenv("TRASH_PURGE_RATE", "200"))  # блобів на секунду, щоб не навантажувати диск
+# Кожен процес раз на REAP_INTERVAL_SEC дешево перевіряє, чи є що прибирати; працює лише власник оренди
+REAP_INTERVAL_SEC = 5
+LEASE = "trash-reaper"
+LEASE_TTL = timedelta(seconds=60)   # оренда продовжується перед кожною пачкою - пачка коротша за TTL
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def _chunks(items, size=BATCH):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def move_to_trash(db, user, storage_names):
+    """
+    Переносить власні файли в кошик пачками UPDATE: ні блобів, ні рядків не видаляємо,
+    тому навіть десятки тисяч файлів - це кілька запитів. Повертає кількість перенесених.
+    """
+    count = 0
+    now = datetime.now()
+    for names in _chunks(storage_names):
+        files = db.query(models.File.id, models.File.storage_name, models.File.display_name, models.File.owner_id) \
+            .filter(models.File.owner_id == user.id, models.File.trashed.is_(False),
+                    models.File.storage_name.in_(names)).all()
+        if not files: continue
+        ids = [f.id for f in files]
+        # Масовий UPDATE не піднімає version сам - робимо це явно, щоб не зламати оптимістичне блокування
+        db.execute(update(models.File).where(models.File.id.in_(ids))
+                   .values(trashed=True, deleted_at=now, version=models.File.version + 1))
+        # Публічні посилання перевіряються без БД, тому відкликаємо їх явно
+        link_ids = [i for (i,) in db.query(models.ShareLink.id).filter(
+            models.ShareLink.file_id.in_(ids), models.ShareLink.revoked.is_(False))]
+        if link_ids:
+            db.execute(update(models.ShareLink).where(models.ShareLink.id.in_(link_ids)).values(revoked=True))
+        events.notify_many(db, files, "deleted")
+        db.info.setdefault("revoked_links", []).extend(link_ids)
+        count += len(files)
+    return count
+
+
+def after_commit(db):
+    """Локальні кеші оновлюємо тільки після commit."""
+    for link_id in db.info.pop("revoked_links", []):
+        links.revoke(link_id)
+    authz.invalidate()
+
+
+def _free_name(db, file):
+    """Ім'я для відновленого файлу: якщо в папці вже є живий файл з таким ім'ям - 'a (2).txt'."""
+    name, n = file.display_name, 1
+    root, ext = posixpath.splitext(file.display_name)
+    while db.query(models.File.id).filter(
+            models.File.owner_id == file.owner_id, models.File.folder_id == file.folder_id,
+            models.File.display_name == name, models.File.trashed.is_(False)).first():
+        n += 1
+        name = f"{root} ({n}){ext}"
+    return name
+
+
+def restore(db, user, storage_names):
+    count = 0
+    for names in _chunks(storage_names):
+        files = db.query(models.File).filter(
+            models.File.owner_id == user.id, models.File.trashed.is_(True),
+            models.File.deleted_at > PURGE_NOW, models.File.storage_name.in_(names)).all()
+        for f in files:
+            f.display_name = _free_name(db, f)
+            f.trashed = False
+            f.deleted_at = None
+            db.flush()  # наступний _free_name має бачити щойно відновлене ім'я
+        events.notify_many(db, files, "restored")
+        count += len(files)
+    return count
+
+
+def schedule_purge(db, user, storage_names=None):
+    """Очищення кошика: позначаємо, а видаляє прибиральник - запит повертається одразу."""
+    q = update(models.File).where(models.File.owner_id == user.id, models.File.trashed.is_(True)) \
+        .values(deleted_at=PURGE_NOW, version=models.File.version + 1)
+    if storage_names is None:
+        count = db.execute(q).rowcount
+    else:
+        count = sum(db.execute(q.where(models.File.storage_name.in_(names))).rowcount
+                    for names in _chunks(storage_names))
+    return count
+
+
+def _expired(cutoff):
+    return (models.File.trashed.is_(True), models.File.deleted_at < cutoff)
+
+
+def purge_batch(db, cutoff, limit=PURGE_BATCH):
+    """
+    Видаляє з БД до limit прострочених файлів разом із залежними рядками і повертає їх storage_name.
+    Спершу commit, потім блоби: після падіння між ними лишаться сироти, яких знайде fsck.py.
+    None - файл з пачки відновили між вибіркою і DELETE; пачку відкочено, її треба вибрати заново.
+    """
+    rows = db.query(models.File.id, models.File.storage_name).filter(*_expired(cutoff)) \
+        .order_by(models.File.deleted_at).limit(limit).with_for_update().all()
+    if not rows: return []
+    ids = [r.id for r in rows]
+    for model in (models.Permission, models.GroupPermission, models.ShareLink):
+        db.query(model).filter(model.file_id.in_(ids)).delete(synchronize_session=False)
+    # Умову перевіряємо ще раз у самому DELETE: на SQLite FOR UPDATE не блокує рядки
+    deleted = db.query(models.File).filter(models.File.id.in_(ids), *_expired(cutoff)) \
+        .delete(synchronize_session=False)
+    if deleted != len(ids):
+        db.rollback()
+        return None
+    db.commit()
+    return [r.storage_name for r in rows]
+
+
+def remove_blobs(names, rate=PURGE_RATE):
+    """Видаляє блоби не швидше за rate на секунду."""
+    started = time.monotonic()
+    for i, name in enumerate(names, 1):
+        try:
+            os.remove(storage.blob_path(name))
+        except FileNotFoundError:
+            pass
+        if rate:
+            ahead = i / rate - (time.monotonic() - started)
+            if ahead > 0: time.sleep(ahead)
+
+
+def reap(retention=RETENTION, rate=PURGE_RATE, holder=None):
+    """
+    Один прохід прибиральника: пачка за пачкою, поки є прострочені. Повертає кількість видалених.
+    З holder кожна пачка - лише під орендою: інші процеси в цей час нічого не видаляють.
+    """
+    total = 0
+    cutoff = datetime.now() - retention
+    while True:
+        with database.SessionLocal() as db:
+            if db.query(models.File.id).filter(*_expired(cutoff)).first() is None: break
+            if holder and not leases.acquire(db, LEASE, holder, LEASE_TTL): break
+            names = purge_batch(db, cutoff)
+        if names is None: continue
+        if not names: break
+        remove_blobs(names, rate)
+        total += len(names)
+    if total: authz.invalidate()
+    return total
+
+
+def _run():
+    while True:
+        try:
+            purged = reap(holder=leases.process_id())
+            if purged: print(f"Trash: purged {purged} files")
+        except Exception as e:
+            print(f"Trash reaper error: {e}")
+        time.sleep(REAP_INTERVAL_SEC)
+
+
+def start_reaper():
+    """Запускається в кожному воркері; одночасно прибирає лише один процес - власник оренди в БД."""
+    global _started
+    with _start_lock:
+        if _started: return
+        _started = True
+    threading.Thread(target=_run, name="trash-reaper", daemon=True).start()
@@ -1,10 +1,62 @@
-import pytest
+import importlib.util
+import os
+import shutil
 import sys
+import tempfile
+
+import pytest
 from PyQt6.QtWidgets import QApplication
 
+# Серверні модулі читають DATABASE_URL / STORAGE_DIR під час імпорту - задаємо до першого імпорту
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server'))
+_server_tmp = tempfile.mkdtemp(prefix="clouddrive-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_server_tmp, 'test.db')}"
+os.environ["STORAGE_DIR"] = os.path.join(_server_tmp, "storage")
+sys.path.append(SERVER_DIR)
+
+
 @pytest.fixture(scope="session")
 def qapp():
     app = QApplication.instance()
     if app is None:
         app = QApplication([])
-    yield app
\ No newline at end of file
+    yield app
+
+
+@pytest.fixture
+def server_db():
+    "Чиста БД і сховище для кожного серверного тесту"
+    import database, models, storage, authz
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    shutil.rmtree(storage.STORAGE_DIR, ignore_errors=True)
+    storage.ensure_dirs()
+    authz.invalidate()
+    yield
+
+
+@pytest.fixture(scope="session")
+def server_app():
+    "FastAPI-застосунок сервера. Модуль зветься server_main, щоб не плутати з desktop_client/main.py"
+    cwd = os.getcwd()
+    os.chdir(SERVER_DIR)  # static/ і templates/ підключаються відносними шляхами
+    try:
+        spec = importlib.util.spec_from_file_location("server_main", os.path.join(SERVER_DIR, "main.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.chdir(cwd)
+    return module
+
+
+@pytest.fixture
+def server_client(server_app, server_db):
+    from fastapi.testclient import TestClient
+    return TestClient(server_app.app)
+
+
+def login(client, username, password="pw"):
+    "Реєструє користувача і повертає заголовки з його токеном"
+    client.post("/register", data={"username": username, "password": password})
+    token = client.post("/token", data={"username": username, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
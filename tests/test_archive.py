@@ -0,0 +1,41 @@
+import io
+import unittest
+import zipfile
+from urllib.parse import unquote
+
+import pytest
+
+from conftest import login
+from responses import content_disposition
+
+
+class TestContentDisposition(unittest.TestCase):
+
+    def test_ascii_fallback(self):
+        "Не-ASCII і лапки не потрапляють у filename, повне ім'я - у filename*"
+        header = content_disposition('Звіт "2024".zip')
+        header.encode("latin-1")
+        self.assertIn('filename="____ _2024_.zip"', header)
+        self.assertEqual(unquote(header.split("filename*=UTF-8''")[1]), 'Звіт "2024".zip')
+
+
+class TestArchiveDownload(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def test_non_ascii_folder(self):
+        "Архів папки з кириличною назвою і лапками скачується з коректним заголовком"
+        headers = login(self.client, "alice")
+        folder = '/Звіти "Q1"/'
+        self.client.post("/upload", files={"file": ("a.txt", b"data")}, data={"path": folder}, headers=headers)
+        r = self.client.get("/archive", params={"folder": folder}, headers=headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("filename*=UTF-8''" + "%D0%97", r.headers["content-disposition"])
+        with zipfile.ZipFile(io.BytesIO(r.content)) as z:
+            self.assertEqual(z.read("a.txt"), b"data")
+
+
+if __name__ == '__main__':
+    unittest.main()
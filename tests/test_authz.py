@@ -0,0 +1,131 @@
+import unittest
+
+import pytest
+
+import database, models, authz
+from conftest import login
+
+
+@pytest.mark.usefixtures("server_db")
+class TestResolveMany(unittest.TestCase):
+
+    def setUp(self):
+        self.db = database.SessionLocal()
+        self.owner, self.bob, self.eve = (models.User(username=n) for n in ("owner", "bob", "eve"))
+        self.db.add_all([self.owner, self.bob, self.eve])
+        self.db.flush()
+        self.files = [models.File(display_name=f"f{i}", storage_name=f"s{i}", size=0, owner_id=self.owner.id)
+                      for i in range(4)]
+        self.db.add_all(self.files)
+        self.group = models.Group(name="team", owner_id=self.owner.id)
+        self.group.members.append(models.GroupMember(user_id=self.bob.id))
+        self.db.add(self.group)
+        self.db.flush()
+        f0, f1, f2, _ = self.files
+        self.db.add_all([
+            models.Permission(user_id=self.bob.id, file_id=f0.id, access_level="read"),
+            models.GroupPermission(group_id=self.group.id, file_id=f1.id, access_level="write"),
+            # Пряме read і групове write на той самий файл - перемагає вищий рівень
+            models.Permission(user_id=self.bob.id, file_id=f2.id, access_level="read"),
+            models.GroupPermission(group_id=self.group.id, file_id=f2.id, access_level="write"),
+        ])
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def levels(self, user, db=None):
+        db = db or database.SessionLocal()
+        with db:
+            return [authz.resolve_many(db, user, self.files)[f.id] for f in self.files]
+
+    def test_direct_and_group(self):
+        "Власник, пряме право, право через групу, найвищий з двох і відсутність доступу"
+        self.assertEqual(self.levels(self.owner), ["owner"] * 4)
+        self.assertEqual(self.levels(self.bob), ["read", "write", "write", None])
+        self.assertEqual(self.levels(self.eve), [None] * 4)
+
+    def test_process_cache(self):
+        "Повторний виклик у новому запиті обходиться без звернення до БД"
+        self.levels(self.bob)
+        self.db.query(models.Permission).delete()
+        self.db.commit()
+        self.assertEqual(self.levels(self.bob), ["read", "write", "write", None])
+
+    def test_invalidate(self):
+        "Після invalidate(file_id) рівень для цього файлу перечитується, решта - з кешу"
+        self.levels(self.bob)
+        self.db.query(models.Permission).delete()
+        self.db.commit()
+        authz.invalidate(self.files[0].id)
+        self.assertEqual(self.levels(self.bob), [None, "write", "write", None])
+        authz.invalidate()
+        self.assertEqual(self.levels(self.bob), [None, "write", "write", None])
+        self.db.query(models.GroupPermission).delete()
+        self.db.commit()
+        authz.invalidate()
+        self.assertEqual(self.levels(self.bob), [None] * 4)
+
+    def test_request_cache(self):
+        "У межах одного запиту (сесії) результат не змінюється навіть після invalidate"
+        with database.SessionLocal() as db:
+            self.assertEqual(authz.access_level(db, self.bob, self.files[0]), "read")
+            authz.invalidate()
+            self.db.query(models.Permission).delete()
+            self.db.commit()
+            self.assertEqual(authz.access_level(db, self.bob, self.files[0]), "read")
+
+    def test_visible_filter(self):
+        "Список файлу: власні, розшарені напряму і через групу, без кошика"
+        self.files[1].trashed = True
+        self.db.commit()
+
+        def visible(user):
+            return sorted(f.display_name for f in self.db.query(models.File).filter(authz.visible_filter(user)))
+        self.assertEqual(visible(self.owner), ["f0", "f2", "f3"])
+        self.assertEqual(visible(self.bob), ["f0", "f2"])
+        self.assertEqual(visible(self.eve), [])
+
+
+class TestGroups(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def setUp(self):
+        self.alice = login(self.client, "alice")
+        self.bob = login(self.client, "bob")
+        self.client.post("/upload", files={"file": ("doc.txt", b"x")}, headers=self.alice)
+        self.name = self.client.get("/files", headers=self.alice).json()[0]["storage_name"]
+
+    def bob_files(self):
+        return [f["access_type"] for f in self.client.get("/files", headers=self.bob).json()]
+
+    def test_group_membership_grants_access(self):
+        "Учасник групи отримує доступ; після видалення з групи - втрачає одразу"
+        self.assertEqual(self.client.post("/groups", json={"name": "team"}, headers=self.alice).status_code, 200)
+        self.assertEqual(self.client.post("/groups", json={"name": "team"}, headers=self.bob).status_code, 400)
+        self.client.post("/share", json={"storage_name": self.name, "target_group": "team", "level": "write"},
+                         headers=self.alice)
+        self.assertEqual(self.bob_files(), [])
+
+        r = self.client.post("/groups/team/members", json={"username": "bob"}, headers=self.alice)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.bob_files(), ["write"])
+        self.assertEqual(self.client.get(f"/raw/{self.name}", headers=self.bob).status_code, 200)
+
+        self.client.delete("/groups/team/members/bob", headers=self.alice)
+        self.assertEqual(self.bob_files(), [])
+        self.assertEqual(self.client.get(f"/raw/{self.name}", headers=self.bob).status_code, 404)
+
+    def test_only_owner_changes_members(self):
+        self.client.post("/groups", json={"name": "team"}, headers=self.alice)
+        r = self.client.post("/groups/team/members", json={"username": "bob"}, headers=self.bob)
+        self.assertEqual(r.status_code, 403)
+        r = self.client.post("/groups/nope/members", json={"username": "bob"}, headers=self.alice)
+        self.assertEqual(r.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
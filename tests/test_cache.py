@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'desktop_client')))
+
+from cache import BlobCache
+
+
+class TestBlobCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = BlobCache(self.tmp.name, max_bytes=10)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_and_get(self):
+        "Записаний блоб читається з тією ж версією та ETag"
+        self.cache.put("a", 1, '"e1"', [b"abc", b"de"])
+        path, entry = self.cache.get("a")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"abcde")
+        self.assertEqual(entry["version"], 1)
+        self.assertEqual(entry["etag"], '"e1"')
+
+    def test_lru_eviction(self):
+        "При переповненні викидається найдавніше використаний запис"
+        self.cache.put("a", 1, None, [b"1234"])
+        self.cache.put("b", 1, None, [b"1234"])
+        self.cache.get("a")
+        self.cache.put("c", 1, None, [b"1234"])
+
+        self.assertIsNotNone(self.cache.get("a")[0])
+        self.assertIsNone(self.cache.get("b")[0])
+        self.assertIsNotNone(self.cache.get("c")[0])
+
+    def test_corrupted_entry_dropped(self):
+        "Пошкоджений на диску блоб не віддається"
+        path = self.cache.put("a", 1, None, [b"abc"])
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, "wb") as f:
+            f.write(b"xyz")
+        # Запис пізніше, ніж кеш (тут - у той самий тік годинника ФС, тому зсуваємо mtime явно)
+        os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+        self.assertEqual(self.cache.get("a"), (None, None))
+
+    def test_truncated_entry_dropped(self):
+        "Обрізаний блоб викидається за розміром"
+        path = self.cache.put("a", 1, None, [b"abc"])
+        with open(path, "wb") as f:
+            f.write(b"ab")
+        self.assertEqual(self.cache.get("a"), (None, None))
+
+    def test_get_does_not_rehash(self):
+        "Читання звіряє лише розмір і mtime - sha256 рахується тільки під час запису"
+        self.cache.put("a", 1, None, [b"abc"])
+        with patch("cache.sha256_file", side_effect=AssertionError("rehash")):
+            self.assertIsNotNone(self.cache.get("a")[0])
+
+    def test_index_persisted(self):
+        "Індекс переживає перезапуск клієнта"
+        self.cache.put("a", 7, None, [b"abc"])
+        reopened = BlobCache(self.tmp.name, max_bytes=10)
+        self.assertEqual(reopened.get("a")[1]["version"], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
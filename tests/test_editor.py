@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'desktop_client')))
+
+from editor import cut_page, decode_page, changed_region, restore_line_endings
+
+
+class TestEditorPaging(unittest.TestCase):
+
+    def test_cut_page_on_newline(self):
+        "Сторінка закінчується на переносі рядка, якщо це не кінець файлу"
+        self.assertEqual(cut_page(b"line1\nline2\npart", at_eof=False), 12)
+        self.assertEqual(cut_page(b"line1\nline2\npart", at_eof=True), 16)
+        self.assertEqual(cut_page(b"no newline", at_eof=False), 10)
+
+    def test_broken_utf8_is_read_only(self):
+        "Розірваний UTF-8 символ показується, але сторінка не редагується"
+        data = "привіт".encode("utf-8")
+        self.assertEqual(decode_page(data), ("привіт", True))
+        self.assertFalse(decode_page(data[:-1])[1])
+
+    def test_changed_region(self):
+        "На сервер іде лише змінений фрагмент"
+        self.assertIsNone(changed_region(b"abc", b"abc"))
+        self.assertEqual(changed_region(b"0123456789", b"01ABCDEF56789"), (2, 3, b"ABCDEF"))
+        self.assertEqual(changed_region(b"aaa", b"aaaa"), (3, 0, b"a"))
+        self.assertEqual(changed_region(b"abcd", b"ad"), (1, 2, b""))
+
+    def test_region_applies(self):
+        "Застосування фрагмента до старих байтів дає новий вміст"
+        old, new = b"hello world\nsecond line\n", b"hello there world\nline\n"
+        offset, length, data = changed_region(old, new)
+        self.assertEqual(old[:offset] + data + old[offset + length:], new)
+
+    def test_line_endings_untouched_lines(self):
+        "Незмінені рядки зберігають свої переноси навіть у файлі зі змішаними \\r\\n і \\n"
+        original = "a\r\nb\nc\r\nd"
+        shown = original.replace("\r\n", "\n")
+        self.assertEqual(restore_line_endings(original, shown), original)
+        self.assertEqual(restore_line_endings(original, shown.replace("b", "B")), "a\r\nB\nc\r\nd")
+
+    def test_line_endings_inserted_lines(self):
+        "Вставлений рядок бере перенос сусіда, дописаний після останнього - переважний"
+        self.assertEqual(restore_line_endings("a\nb\r\nc\r\n", "a\nb\nx\nc\n"), "a\nb\r\nx\r\nc\r\n")
+        self.assertEqual(restore_line_endings("a\r\nb", "a\nb\nc"), "a\r\nb\r\nc")
+        self.assertEqual(restore_line_endings("a\r\nb\r\nc", "c"), "c")
+
+    def test_mixed_page_saves_only_edit(self):
+        "Правка одного рядка в змішаному файлі дає фрагмент лише з цим рядком"
+        original = "one\r\ntwo\nthree\r\n"
+        edited = restore_line_endings(original, original.replace("\r\n", "\n").replace("two", "2"))
+        self.assertEqual(changed_region(original.encode(), edited.encode()), (5, 3, b"2"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import pytest
+
+import database, models, events
+
+
+def add_event(event_id, user_id=1):
+    with database.SessionLocal() as db:
+        db.add(models.Event(id=event_id, user_id=user_id, kind="updated", storage_name=f"s{event_id}", filename="f"))
+        db.commit()
+
+
+def drain(q):
+    items = []
+    while not q.empty(): items.append(q.get_nowait()["id"])
+    return items
+
+
+@pytest.mark.usefixtures("server_db")
+class TestHub(unittest.TestCase):
+
+    def test_late_commit_is_delivered_once(self):
+        "Подія з меншим id, закомічена пізніше, доходить до підписника і не повторюється"
+        async def scenario():
+            hub = events.Hub()
+            add_event(3)
+            await hub.start()
+            q = hub.subscribe(1)
+            add_event(10)
+            await asyncio.sleep(0.1)
+            add_event(5)  # id видано раніше, commit - пізніше
+            await asyncio.sleep(0.1)
+            add_event(11)
+            await asyncio.sleep(0.1)
+            hub.task.cancel()
+            return drain(q)
+
+        with patch.object(events, "POLL_SEC", 0.02):
+            self.assertEqual(asyncio.run(scenario()), [10, 5, 11])
+
+    def test_single_poll_loop(self):
+        "Одночасні перші підключення запускають лише один цикл опитування"
+        started = []
+
+        async def fake_run(self):
+            started.append(self)
+            await asyncio.sleep(3600)
+
+        async def scenario():
+            hub = events.Hub()
+            await asyncio.gather(*(hub.start() for _ in range(5)))
+            await asyncio.sleep(0)
+            hub.task.cancel()
+
+        with patch.object(events.Hub, "_run", fake_run):
+            asyncio.run(scenario())
+        self.assertEqual(len(started), 1)
+
+    def test_backlog_includes_late_commits(self):
+        "Догін після перепідключення бачить і пізні події з id, меншим за курсор"
+        add_event(5)
+        add_event(10)
+        self.assertEqual([e["id"] for e in events.Hub().backlog(1, 10)], [5, 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
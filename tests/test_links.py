@@ -0,0 +1,148 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import update
+
+import database, links, models
+from conftest import login
+
+
+class TestPublicLinks(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def setUp(self):
+        # Стан модуля переживає тести, а id посилань після drop_all починаються знову з 1
+        links._revoked = set()
+        links._next_refresh = 0.0
+        patcher = patch.object(links, "FLUSH_SEC", 3600)  # лічильники скидаються лише явним flush
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        links.flush()
+        self.headers = login(self.client, "alice")
+        self.client.post("/upload", files={"file": ("a.txt", b"data")}, headers=self.headers)
+        self.name = self.client.get("/files", headers=self.headers).json()[0]["storage_name"]
+        self.link = self.client.post("/links", json={"storage_name": self.name}, headers=self.headers).json()
+
+    def test_download(self):
+        "Посилання віддає файл без входу"
+        r = self.client.get(self.link["url"])
+        self.assertEqual((r.status_code, r.content), (200, b"data"))
+        self.assertIn("public", r.headers["cache-control"])
+
+    def test_tampered_token(self):
+        "Змінений payload чи підпис і сміття замість токена - 404"
+        payload, sig = self.link["url"][len("/s/"):].split(".")
+        other = links.sign(self.link["id"], "other.txt", int(time.time()) + 3600).split(".")[0]
+        forged = sig[:-2] + ("AA" if sig[-2:] != "AA" else "BB")
+        for token in (f"{other}.{sig}", f"{payload}.{forged}", "garbage", f"{payload}.{sig}.x"):
+            self.assertEqual(self.client.get(f"/s/{token}").status_code, 404, token)
+
+    def test_expired_token(self):
+        "Правильно підписаний, але протермінований токен - 410"
+        token = links.sign(self.link["id"], self.name, int(time.time()) - 1)
+        self.assertEqual(self.client.get(f"/s/{token}").status_code, 410)
+
+    def test_revoke(self):
+        "Відкликане посилання - 410 одразу і після перечитування списку з БД"
+        r = self.client.delete(f"/links/{self.link['id']}", headers=self.headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.client.get(self.link["url"]).status_code, 410)
+        links._next_refresh = 0.0
+        self.assertEqual(self.client.get(self.link["url"]).status_code, 410)
+        self.assertEqual(self.client.get("/links", headers=self.headers).json()[0]["revoked"], True)
+
+    def test_revoked_by_other_worker(self):
+        "Відкликання з іншого процесу (лише в БД) діє після оновлення списку"
+        with database.SessionLocal() as db:
+            db.execute(update(models.ShareLink).values(revoked=True))
+            db.commit()
+        links._next_refresh = time.monotonic() + 60
+        self.assertEqual(self.client.get(self.link["url"]).status_code, 200)
+        links._next_refresh = 0.0
+        self.assertEqual(self.client.get(self.link["url"]).status_code, 410)
+
+    def test_trash_revokes_links(self):
+        "Перенесення файлу в кошик відкликає його посилання"
+        self.client.delete(f"/delete/{self.name}", headers=self.headers)
+        self.assertEqual(self.client.get(self.link["url"]).status_code, 410)
+        links._next_refresh = 0.0
+        self.assertEqual(self.client.get(self.link["url"]).status_code, 410)
+
+    def test_download_counter(self):
+        "Скачування рахуються в пам'яті і потрапляють у share_links.downloads при flush; HEAD не рахується"
+        for _ in range(3):
+            self.client.get(self.link["url"])
+        self.client.head(self.link["url"])
+        with database.SessionLocal() as db:
+            self.assertEqual(db.get(models.ShareLink, self.link["id"]).downloads, 0)
+        links.flush()
+        with database.SessionLocal() as db:
+            self.assertEqual(db.get(models.ShareLink, self.link["id"]).downloads, 3)
+
+        links.record_download(self.link["id"])
+        self.assertEqual(self.client.get("/links", headers=self.headers).json()[0]["downloads"], 4)
+
+    def test_raw_requires_auth(self):
+        "Приватний /raw без токена - 401, навіть коли на файл є публічне посилання"
+        self.assertEqual(self.client.get(f"/raw/{self.name}").status_code, 401)
+
+
+class TestDownloadTickets(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def setUp(self):
+        self.headers = login(self.client, "alice")
+        for name in ("a.txt", "b.txt"):
+            self.client.post("/upload", files={"file": (name, name.encode())}, headers=self.headers)
+        files = sorted(self.client.get("/files", headers=self.headers).json(), key=lambda f: f["filename"])
+        self.names = [f["storage_name"] for f in files]
+
+    def url_for(self, **body):
+        r = self.client.post("/download_url", json=body, headers=self.headers)
+        self.assertEqual(r.status_code, 200)
+        return r.json()["url"]
+
+    def test_raw_ticket(self):
+        "Квиток відкриває без заголовка лише той файл, на який виданий; JWT у query більше не приймається"
+        url = self.url_for(storage_name=self.names[0])
+        self.assertNotIn(self.headers["Authorization"].split()[1], url)
+        r = self.client.get(url)
+        self.assertEqual((r.status_code, r.content), (200, b"a.txt"))
+
+        ticket = url.split("ticket=")[1]
+        self.assertEqual(self.client.get(f"/raw/{self.names[1]}?ticket={ticket}").status_code, 401)
+        self.assertEqual(self.client.get(f"/raw/{self.names[0]}?ticket=garbage").status_code, 401)
+        jwt = self.headers["Authorization"].split()[1]
+        self.assertEqual(self.client.get(f"/raw/{self.names[0]}?token={jwt}").status_code, 401)
+
+    def test_expired_ticket(self):
+        "Протермінований квиток - 401"
+        with patch.object(links, "TICKET_TTL_SEC", -1):
+            url = self.url_for(storage_name=self.names[0])
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_archive_ticket(self):
+        "Квиток на архів діє лише для того самого набору файлів"
+        url = self.url_for(names=self.names)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url.replace(self.names[1], self.names[0])).status_code, 401)
+
+    def test_access_checked_on_download(self):
+        "Квиток не обходить права: чужий файл за квитком - як і з заголовком"
+        bob = login(self.client, "bob")
+        r = self.client.post("/download_url", json={"storage_name": self.names[0]}, headers=bob)
+        self.assertEqual(self.client.get(r.json()["url"]).status_code,
+                         self.client.get(f"/raw/{self.names[0]}", headers=bob).status_code)
+        self.assertIn(self.client.get(r.json()["url"]).status_code, (403, 404))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+import models, migrate
+
+# Схема files/permissions у тому вигляді, як її створювала найперша версія сервера
+BASELINE = [
+    "CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR, hashed_password VARCHAR, PRIMARY KEY (id))",
+    "CREATE TABLE files (id INTEGER NOT NULL, display_name VARCHAR, extension VARCHAR, size INTEGER, "
+    "storage_name VARCHAR, created_at DATETIME, updated_at DATETIME, uploader_name VARCHAR, editor_name VARCHAR, "
+    "owner_id INTEGER, PRIMARY KEY (id), UNIQUE (storage_name), FOREIGN KEY(owner_id) REFERENCES users (id))",
+    "CREATE TABLE permissions (id INTEGER NOT NULL, user_id INTEGER, file_id INTEGER, access_level VARCHAR, "
+    "PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id), FOREIGN KEY(file_id) REFERENCES files (id))",
+    "INSERT INTO users (id, username) VALUES (1, 'alice')",
+    "INSERT INTO files (id, display_name, size, storage_name, created_at, updated_at, owner_id) "
+    "VALUES (1, 'a.txt', 3, 'x_a.txt', '2024-01-01 00:00:00', '2024-01-01 00:00:00', 1)",
+]
+
+
+class TestUpgrade(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'old.db')}")
+        with self.engine.begin() as conn:
+            for sql in BASELINE: conn.execute(text(sql))
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_old_database_upgraded(self):
+        "Стара БД отримує нові колонки зі значеннями за замовчуванням, старі рядки читаються"
+        self.assertTrue(migrate.upgrade(self.engine))
+        with Session(self.engine) as db:
+            f = db.query(models.File).one()
+            self.assertEqual((f.version, f.trashed, f.sha256, f.folder_id), (1, False, None, None))
+            f.size = 4
+            db.commit()
+            self.assertEqual(f.version, 2)
+
+    def test_idempotent(self):
+        migrate.upgrade(self.engine)
+        self.assertEqual(migrate.upgrade(self.engine), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
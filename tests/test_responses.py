@@ -0,0 +1,186 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'desktop_client')))
+
+import api_client
+import responses
+from cache import BlobCache
+from conftest import login
+from responses import BlobResponse, parse_range
+
+
+class TestParseRange(unittest.TestCase):
+
+    def test_variants(self):
+        "Повний, відкритий і суфіксний діапазони; кінець за межами файлу обрізається"
+        self.assertIsNone(parse_range(None, 10))
+        self.assertEqual(parse_range("bytes=2-5", 10), (2, 5))
+        self.assertEqual(parse_range("bytes=7-", 10), (7, 9))
+        self.assertEqual(parse_range("bytes=5-100", 10), (5, 9))
+        self.assertEqual(parse_range("bytes=-3", 10), (7, 9))
+        self.assertEqual(parse_range("bytes=-100", 10), (0, 9))
+
+    def test_unsatisfiable(self):
+        "Початок за кінцем файлу, перевернутий, порожній суфікс і кілька діапазонів - ValueError"
+        for header in ("bytes=10-", "bytes=5-2", "bytes=-0", "bytes=-", "bytes=0-1,4-5", "items=0-1"):
+            with self.assertRaises(ValueError, msg=header):
+                parse_range(header, 10)
+
+
+class TestBlobResponse(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def setUp(self):
+        self.headers = login(self.client, "alice")
+        self.content = bytes(range(256)) * (3 * responses.CHUNK_SIZE // 256 + 7)
+        self.client.post("/upload", files={"file": ("a.bin", self.content)}, headers=self.headers)
+        self.name = self.client.get("/files", headers=self.headers).json()[0]["storage_name"]
+        self.url = f"/raw/{self.name}"
+
+    def get(self, **headers):
+        return self.client.get(self.url, headers={**self.headers, **headers})
+
+    def test_full_body_in_chunks(self):
+        "Без Range - 200, весь файл читається шматками, без mmap"
+        calls = []
+        send_chunks = BlobResponse._send_chunks
+
+        async def spy(response, f, count, send):
+            calls.append(count)
+            await send_chunks(response, f, count, send)
+
+        with patch.object(BlobResponse, "_send_chunks", spy), \
+                patch.object(BlobResponse, "_send_mmap", side_effect=AssertionError("mmap")):
+            r = self.get()
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.content, self.content)
+        self.assertEqual(r.headers["accept-ranges"], "bytes")
+        self.assertEqual(calls, [len(self.content)])
+
+    def test_range_via_mmap(self):
+        "Range через кілька чанків і суфіксний діапазон віддаються через mmap з правильним Content-Range"
+        calls = []
+        send_mmap = BlobResponse._send_mmap
+
+        async def spy(response, f, count, send):
+            calls.append(count)
+            await send_mmap(response, f, count, send)
+
+        size = len(self.content)
+        start, end = responses.CHUNK_SIZE - 10, 2 * responses.CHUNK_SIZE + 10
+        with patch.object(BlobResponse, "_send_mmap", spy), \
+                patch.object(BlobResponse, "_send_chunks", side_effect=AssertionError("chunks")):
+            r = self.get(Range=f"bytes={start}-{end}")
+            suffix = self.get(Range="bytes=-5")
+        self.assertEqual(r.status_code, 206)
+        self.assertEqual(r.content, self.content[start:end + 1])
+        self.assertEqual(r.headers["content-range"], f"bytes {start}-{end}/{size}")
+        self.assertEqual(suffix.status_code, 206)
+        self.assertEqual(suffix.content, self.content[-5:])
+        self.assertEqual(suffix.headers["content-range"], f"bytes {size - 5}-{size - 1}/{size}")
+        self.assertEqual(calls, [end - start + 1, 5])
+
+    def test_multi_range_unsatisfiable(self):
+        "Кілька діапазонів і початок за кінцем файлу - 416 з розміром у Content-Range"
+        for header in ("bytes=0-1,4-5", f"bytes={len(self.content)}-"):
+            r = self.get(Range=header)
+            self.assertEqual(r.status_code, 416, header)
+            self.assertEqual(r.headers["content-range"], f"bytes */{len(self.content)}")
+            self.assertEqual(r.content, b"")
+
+    def test_etag_not_modified(self):
+        "Той самий ETag - 304 без тіла; після зміни файлу ETag інший і вміст віддається знову"
+        etag = self.get().headers["etag"]
+        r = self.get(**{"If-None-Match": etag})
+        self.assertEqual((r.status_code, r.content, r.headers["etag"]), (304, b"", etag))
+
+        self.client.post("/update_content", json={"storage_name": self.name, "content": "new"}, headers=self.headers)
+        r = self.get(**{"If-None-Match": etag})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.content, b"new")
+        self.assertNotEqual(r.headers["etag"], etag)
+
+    def test_head(self):
+        "HEAD - ті самі заголовки, без тіла"
+        r = self.client.head(self.url, headers=self.headers)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.headers["content-length"], str(len(self.content)))
+        self.assertEqual(r.content, b"")
+
+
+class _Streamed:
+    "Відповідь TestClient в інтерфейсі requests.get(..., stream=True)"
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.response = response
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, size):
+        return self.response.iter_bytes(size)
+
+
+class TestClientDownload(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.api = api_client.CloudAPI()
+        self.api.cache = BlobCache(os.path.join(self.tmp.name, "cache"))
+        self.api.token = login(self.client, "alice")["Authorization"].split()[1]
+        self.content = os.urandom(2 * responses.CHUNK_SIZE + 3)
+        self.client.post("/upload", files={"file": ("a.bin", self.content)}, headers=self.api.get_header())
+        self.file = self.client.get("/files", headers=self.api.get_header()).json()[0]
+        self.requested = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fake_get(self, url, headers=None, stream=False, **kwargs):
+        self.requested.append(url)
+        return _Streamed(self.client.get(url[len(api_client.BASE_URL):], headers=headers))
+
+    def test_download_file(self):
+        "download_file пише потік у dest; актуальна копія з кешу береться без мережі"
+        dest = os.path.join(self.tmp.name, "out.bin")
+        with patch.object(api_client.requests, "get", self.fake_get):
+            self.assertTrue(self.api.download_file(self.file["storage_name"], dest))
+            with open(dest, "rb") as f:
+                self.assertEqual(f.read(), self.content)
+            self.assertEqual(len(self.requested), 1)
+
+            self.assertIsNotNone(self.api.fetch_blob(self.file["storage_name"], self.file["version"]))
+            os.remove(dest)
+            self.assertTrue(self.api.download_file(self.file["storage_name"], dest, self.file["version"]))
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(len(self.requested), 2)
+
+    def test_download_missing(self):
+        "Файлу немає на сервері - False, dest не створюється"
+        dest = os.path.join(self.tmp.name, "out.bin")
+        with patch.object(api_client.requests, "get", self.fake_get):
+            self.assertFalse(self.api.download_file("missing.bin", dest))
+        self.assertFalse(os.path.exists(dest))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,16 @@ import unittest
 from unittest.mock import MagicMock
 import sys
 import os
+import tempfile
+import threading
 import pytest
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'desktop_client')))
 
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor, QImage
+from PyQt6.QtWidgets import QApplication
 from desktop_client.gui import MainWindow
 
 
@@ -114,6 +120,95 @@ class TestVariantUploader(unittest.TestCase):
         self.assertEqual(uploader_in_table, 'boris')
 
 
+@pytest.mark.usefixtures("qapp")
+class TestImagePreview(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.png = os.path.join(self.tmp.name, "a.png")
+        image = QImage(8, 8, QImage.Format.Format_RGB32)
+        image.fill(QColor("red"))
+        image.save(self.png)
+
+        self.release = threading.Event()
+        self.mock_api = MagicMock()
+        self.mock_api.get_files.return_value = [
+            {'filename': 'a.png', 'extension': '.png', 'uploader': 'anna', 'created_at': '', 'updated_at': '',
+             'editor': '', 'access_type': 'owner', 'storage_name': 'png1', 'version': 1, 'sha256': 'x'}]
+        self.mock_api.fetch_blob.side_effect = lambda *args: self.release.wait(5) and self.png
+        self.window = MainWindow(self.mock_api, "tester", lambda: None)
+
+    def tearDown(self):
+        self.release.set()
+        for worker in list(self.window.preview_workers):
+            worker.wait()
+        self.tmp.cleanup()
+
+    def test_preview_does_not_block(self):
+        "Клік по картинці повертається одразу, прев'ю з'являється, коли фоновий потік її завантажив"
+        self.window.on_file_click(0, 0)
+        self.assertEqual(self.window.lbl_preview_img.text(), "Loading...")
+
+        self.release.set()
+        for worker in list(self.window.preview_workers):
+            worker.wait()
+        QApplication.processEvents()
+        self.assertFalse(self.window.lbl_preview_img.pixmap().isNull())
+        self.mock_api.fetch_blob.assert_called_once_with('png1', 1, 'x')
+
+
+@pytest.mark.usefixtures("qapp")
+class TestRemoteRefresh(unittest.TestCase):
+
+    def setUp(self):
+        self.files = [
+            {'filename': f'{n}.js', 'extension': '.js', 'uploader': 'anna', 'created_at': '', 'updated_at': '',
+             'editor': '', 'access_type': 'owner', 'storage_name': n, 'version': 1} for n in ('a', 'b')]
+        self.mock_api = MagicMock()
+        self.mock_api.get_files.side_effect = lambda: [dict(f) for f in self.files]
+        self.mock_api.read_range.return_value = (b"let x = 1;", 10)
+        self.window = MainWindow(self.mock_api, "tester", lambda: None)
+        self.window.table.selectRow(0)
+        self.window.on_file_click(0, 0)
+
+    def event(self, storage_name, version=None):
+        if version:
+            self.files[[f['storage_name'] for f in self.files].index(storage_name)]['version'] = version
+        self.window.on_remote_change({'kind': 'updated', 'storage_name': storage_name})
+        self.window.reload_if_idle()
+
+    def selected(self):
+        return {self.window.table.item(i.row(), 0).text() for i in self.window.table.selectedIndexes()}
+
+    def test_other_file_keeps_preview(self):
+        "Зміна іншого файлу оновлює рядки, але не чіпає відкрите прев'ю і виділення"
+        self.event('b', version=2)
+        self.assertEqual(self.window.current_storage_name, 'a')
+        self.assertEqual(self.window.txt_preview.toPlainText(), "let x = 1;")
+        self.assertEqual(self.selected(), {'a.js'})
+        self.assertEqual(self.window.table.currentRow(), 0)
+        self.assertEqual(self.mock_api.read_range.call_count, 1)
+        self.assertEqual(self.window.table.item(1, 0).data(Qt.ItemDataRole.UserRole + 2), 2)
+
+    def test_open_file_reloaded(self):
+        "Нова версія відкритого файлу перечитує прев'ю; подія без зміни версії - ні"
+        self.event('a')
+        self.assertEqual(self.mock_api.read_range.call_count, 1)
+        self.mock_api.read_range.return_value = (b"let x = 2;", 10)
+        self.event('a', version=2)
+        self.assertEqual(self.mock_api.read_range.call_count, 2)
+        self.assertEqual(self.window.txt_preview.toPlainText(), "let x = 2;")
+        self.assertEqual(self.window.current_version, 2)
+
+    def test_open_file_removed(self):
+        "Відкритий файл зник зі списку - прев'ю скидається"
+        del self.files[0]
+        self.event('a')
+        self.assertIsNone(self.window.current_storage_name)
+        self.assertEqual(self.window.txt_preview.toPlainText(), "")
+        self.assertFalse(self.window.btn_delete.isEnabled())
+
+
 if __name__ == '__main__':
     # Запуск unittest
     unittest.main()
\ No newline at end of file
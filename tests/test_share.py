@@ -0,0 +1,61 @@
+import unittest
+
+import pytest
+
+from conftest import login
+
+
+class TestShareByStorageName(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def setUp(self):
+        self.alice = login(self.client, "alice")
+        self.bob = login(self.client, "bob")
+        # Два файли з однаковим ім'ям у різних папках
+        for path in ("/a/", "/b/"):
+            self.client.post("/upload", files={"file": ("same.txt", path.encode())}, data={"path": path},
+                             headers=self.alice)
+        files = self.client.get("/files", headers=self.alice).json()
+        self.names = {f["path"]: f["storage_name"] for f in files}
+
+    def shared_with_bob(self):
+        return {f["storage_name"]: f["access_type"] for f in self.client.get("/files", headers=self.bob).json()}
+
+    def test_share_exact_file(self):
+        "Розшарюється саме вибраний файл, а не перший з таким ім'ям"
+        r = self.client.post("/share", json={"storage_name": self.names["/b/"], "target_user": "bob", "level": "write"},
+                             headers=self.alice)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.shared_with_bob(), {self.names["/b/"]: "write"})
+
+    def test_share_requires_owner(self):
+        r = self.client.post("/share", json={"storage_name": self.names["/a/"], "target_user": "alice", "level": "read"},
+                             headers=self.bob)
+        self.assertEqual(r.status_code, 404)
+
+    def test_guest_overwrites_only_by_storage_name(self):
+        "Гість оновлює розшарений файл лише за storage_name; завантаження за ім'ям створює його власний файл"
+        self.client.post("/share", json={"storage_name": self.names["/b/"], "target_user": "bob", "level": "write"},
+                         headers=self.alice)
+        r = self.client.post("/upload", files={"file": ("same.txt", b"bob")}, data={"storage_name": self.names["/b/"]},
+                             headers=self.bob)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.client.get(f"/raw/{self.names['/b/']}", headers=self.alice).content, b"bob")
+        self.assertEqual(self.client.get(f"/raw/{self.names['/a/']}", headers=self.alice).content, b"/a/")
+
+        self.client.post("/upload", files={"file": ("same.txt", b"own")}, headers=self.bob)
+        self.assertEqual(sorted(self.shared_with_bob().values()), ["owner", "write"])
+
+    def test_read_only_guest_cannot_overwrite(self):
+        self.client.post("/share", json={"storage_name": self.names["/a/"], "target_user": "bob", "level": "read"},
+                         headers=self.alice)
+        r = self.client.post("/upload", files={"file": ("same.txt", b"bob")}, data={"storage_name": self.names["/a/"]},
+                             headers=self.bob)
+        self.assertEqual(r.status_code, 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+import hashlib
+import io
+import os
+import unittest
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+import database, leases, models, storage
+from conftest import login
+
+
+def read_blob(name):
+    with open(storage.blob_path(name), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.usefixtures("server_db")
+class TestWriteJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.db = database.SessionLocal()
+        self.name = "blob_a.txt"
+        with open(storage.blob_path(self.name), "wb") as f:
+            f.write(b"old")
+        self.db.add(models.File(display_name="a.txt", extension=".txt", size=3, storage_name=self.name))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def pending(self):
+        return self.db.query(models.WriteIntent).count()
+
+    def test_publish_and_commit(self):
+        "Блоб підміняється тільки в publish, після commit не лишається ні наміру, ні .old"
+        intent = storage.begin_write(self.name)
+        size, digest = storage.write_blob(intent, io.BytesIO(b"new data"))
+        self.assertEqual((size, digest), (8, hashlib.sha256(b"new data").hexdigest()))
+        self.assertEqual(read_blob(self.name), b"old")
+
+        storage.publish(intent)
+        storage.finish_write(self.db, intent)
+        self.db.commit()
+        storage.release(intent)
+        self.assertEqual(read_blob(self.name), b"new data")
+        self.assertEqual(self.pending(), 0)
+        self.assertEqual(os.listdir(storage.TMP_DIR), [])
+
+    def test_abort_before_publish(self):
+        "Скасування до підміни прибирає тимчасовий файл, блоб не змінюється"
+        intent = storage.begin_write(self.name)
+        storage.write_blob(intent, io.BytesIO(b"new data"))
+        storage.abort_write(intent)
+        self.assertEqual(read_blob(self.name), b"old")
+        self.assertEqual(self.pending(), 0)
+        self.assertEqual(os.listdir(storage.TMP_DIR), [])
+
+    def test_abort_after_publish(self):
+        "Якщо commit не відбувся, вже підмінений блоб повертається до попереднього вмісту"
+        intent = storage.begin_write(self.name, base_version=1)
+        storage.write_blob(intent, io.BytesIO(b"new data"))
+        storage.publish(intent)
+        storage.abort_write(intent)
+        self.assertEqual(read_blob(self.name), b"old")
+        self.assertEqual(os.listdir(storage.TMP_DIR), [])
+
+    def test_checksum_mismatch(self):
+        "Неправильний хеш - виняток, блоб і старий вміст не чіпаються"
+        intent = storage.begin_write(self.name)
+        with self.assertRaises(storage.ChecksumMismatch):
+            storage.write_blob(intent, io.BytesIO(b"new data"), "0" * 64)
+        storage.abort_write(intent)
+        self.assertEqual(read_blob(self.name), b"old")
+        self.assertEqual(os.listdir(storage.TMP_DIR), [])
+
+    def test_write_range(self):
+        "Фрагмент збирається в тимчасовому файлі, блоб змінюється лише після publish"
+        intent = storage.begin_write(self.name)
+        size, digest = storage.write_range(intent, 1, 1, b"LL")
+        self.assertEqual(read_blob(self.name), b"old")
+        storage.publish(intent)
+        self.assertEqual((read_blob(self.name), size), (b"oLLd", 4))
+        self.assertEqual(digest, hashlib.sha256(b"oLLd").hexdigest())
+
+    def test_recover_rolls_back(self):
+        "Після падіння між publish і commit відновлення повертає старий блоб і видаляє новий без метаданих"
+        intent = storage.begin_write(self.name, base_version=1)
+        storage.write_blob(intent, io.BytesIO(b"new data"))
+        storage.publish(intent)
+        fresh = storage.begin_write("blob_new.txt")
+        storage.write_blob(fresh, io.BytesIO(b"orphan"))
+        storage.publish(fresh)
+
+        self.assertEqual(storage.recover(self.db, grace=timedelta(0)), 2)
+        self.assertEqual(read_blob(self.name), b"old")
+        self.assertFalse(os.path.exists(storage.blob_path("blob_new.txt")))
+        self.assertEqual(self.pending(), 0)
+
+    def test_recover_keeps_newer_commit(self):
+        "Якщо після падіння поверх закомітився новіший запис, .old не повертається"
+        crashed = storage.begin_write(self.name, base_version=1)
+        storage.write_blob(crashed, io.BytesIO(b"v2"))
+        storage.publish(crashed)
+        file = self.db.query(models.File).filter_by(storage_name=self.name).one()
+        with storage.writing(self.db, file) as intent:
+            file.size, file.sha256 = storage.write_blob(intent, io.BytesIO(b"v3"))
+
+        self.assertEqual(storage.recover(self.db, grace=timedelta(0)), 1)
+        self.assertEqual(read_blob(self.name), b"v3")
+        self.assertEqual(self.pending(), 0)
+        self.assertEqual(os.listdir(storage.TMP_DIR), [])
+
+    def test_recover_dead_owner_at_once(self):
+        "Намір завершеного процесу розбирається одразу, живого - лише після grace"
+        intent = storage.begin_write(self.name, base_version=1)
+        storage.write_blob(intent, io.BytesIO(b"new data"))
+        storage.publish(intent)
+        self.assertEqual(storage.recover(self.db), 0)
+
+        with patch.object(leases, "is_dead", return_value=True):
+            self.assertEqual(storage.recover_pending(), 1)
+        self.assertEqual(read_blob(self.name), b"old")
+        self.assertEqual(self.pending(), 0)
+
+
+class TestLeases(unittest.TestCase):
+
+    def test_is_dead(self):
+        "Свій процес живий; інше завантаження того ж вузла - мертве; про інші вузли не знаємо"
+        me = leases.process_id()
+        host, boot, pid = me.rsplit(":", 2)
+        self.assertFalse(leases.is_dead(me))
+        self.assertTrue(leases.is_dead(f"{host}:other-boot:{pid}"))
+        self.assertFalse(leases.is_dead(f"other-host:{boot}:{pid}"))
+        self.assertFalse(leases.is_dead(None))
+
+
+class TestConcurrentSave(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def setUp(self):
+        self.headers = login(self.client, "alice")
+        r = self.client.post("/upload", files={"file": ("a.txt", b"v1")}, headers=self.headers)
+        self.assertEqual(r.status_code, 200)
+        self.name = self.client.get("/files", headers=self.headers).json()[0]["storage_name"]
+
+    def commit_other_writer(self, content, write_blob=storage.write_blob):
+        "Повний запис іншого запиту - так, як його робить ендпоінт"
+        with database.SessionLocal() as db:
+            file = db.query(models.File).filter_by(storage_name=self.name).one()
+            with storage.writing(db, file) as intent:
+                file.size, file.sha256 = write_blob(intent, io.BytesIO(content))
+
+    def test_loser_does_not_replace_blob(self):
+        "Запит, що програв гонку версій, отримує 409 і не перезаписує блоб переможця"
+        original = storage.write_blob
+
+        def racing_write(intent, src, expected=None):
+            result = original(intent, src, expected)
+            self.commit_other_writer(b"winner")
+            return result
+
+        with patch.object(storage, "write_blob", racing_write):
+            r = self.client.post("/update_content", json={"storage_name": self.name, "content": "loser"},
+                                 headers=self.headers)
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(read_blob(self.name), b"winner")
+        with database.SessionLocal() as db:
+            self.assertEqual(db.query(models.File).filter_by(storage_name=self.name).one().version, 2)
+            self.assertEqual(db.query(models.WriteIntent).count(), 0)
+        self.assertEqual(os.listdir(storage.TMP_DIR), [])
+
+    def test_save_range(self):
+        "PATCH фрагмента оновлює блоб і версію"
+        r = self.client.patch(f"/content/{self.name}", params={"offset": 1, "length": 1, "version": 1},
+                              content=b"2!", headers={**self.headers, "Content-Type": "application/octet-stream"})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["version"], 2)
+        self.assertEqual(read_blob(self.name), b"v2!")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import unittest
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import update
+
+import database, models, storage, trash, leases
+from conftest import login
+
+
+class TestTrash(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def setUp(self):
+        self.alice = login(self.client, "alice")
+        self.client.post("/upload", files={"file": ("a.txt", b"first")}, headers=self.alice)
+        self.name = self.client.get("/files", headers=self.alice).json()[0]["storage_name"]
+
+    def listed(self):
+        return [f["filename"] for f in self.client.get("/files", headers=self.alice).json()]
+
+    def trashed(self):
+        return [f["storage_name"] for f in self.client.get("/trash", headers=self.alice).json()["files"]]
+
+    def test_trash_and_restore(self):
+        "Видалений файл зникає зі списку і повертається; зайняте ім'я отримує суфікс"
+        self.assertEqual(self.client.delete(f"/delete/{self.name}", headers=self.alice).json()["status"], "trashed")
+        self.assertEqual((self.listed(), self.trashed()), ([], [self.name]))
+        self.assertTrue(os.path.exists(storage.blob_path(self.name)))
+
+        self.client.post("/upload", files={"file": ("a.txt", b"second")}, headers=self.alice)
+        r = self.client.post("/trash/restore", json={"storage_names": [self.name]}, headers=self.alice)
+        self.assertEqual(r.json()["count"], 1)
+        self.assertEqual(sorted(self.listed()), ["a (2).txt", "a.txt"])
+        self.assertEqual(self.trashed(), [])
+
+    def test_reap_expired_only(self):
+        "Прибиральник видаляє рядок і блоб лише після терміну зберігання"
+        self.client.delete(f"/delete/{self.name}", headers=self.alice)
+        self.assertEqual(trash.reap(rate=0), 0)
+        self.assertEqual(trash.reap(retention=timedelta(0), rate=0), 1)
+        self.assertFalse(os.path.exists(storage.blob_path(self.name)))
+        self.assertEqual(self.trashed(), [])
+
+    def test_purge_now(self):
+        "Очищення кошика позначає файли, і прибиральник видаляє їх без очікування терміну"
+        self.client.post("/delete", json={"storage_names": [self.name]}, headers=self.alice)
+        self.assertEqual(self.client.post("/trash/purge", headers=self.alice).json()["count"], 1)
+        self.assertEqual(self.trashed(), [])
+        self.assertEqual(trash.reap(rate=0, holder="worker-1"), 1)
+        self.assertFalse(os.path.exists(storage.blob_path(self.name)))
+
+    def test_restored_between_select_and_delete(self):
+        "Файл, відновлений між вибіркою і DELETE, не видаляється - пачка відкочується"
+        self.client.delete(f"/delete/{self.name}", headers=self.alice)
+        original, calls = trash._expired, []
+
+        def restore_before_delete(cutoff):
+            # Друге звернення - умова самого DELETE; на SQLite інше з'єднання тут уже заблоковане,
+            # тому "паралельне" відновлення робимо в тій самій транзакції
+            calls.append(cutoff)
+            if len(calls) == 2:
+                db.execute(update(models.File).where(models.File.storage_name == self.name)
+                           .values(trashed=False, deleted_at=None))
+            return original(cutoff)
+
+        with patch.object(trash, "_expired", restore_before_delete), database.SessionLocal() as db:
+            self.assertIsNone(trash.purge_batch(db, trash.PURGE_NOW + timedelta(days=36500)))
+        self.assertEqual(self.trashed(), [self.name])
+        self.assertTrue(os.path.exists(storage.blob_path(self.name)))
+
+    def test_lease_single_reaper(self):
+        "Оренду тримає один процес; інший отримує її лише після закінчення"
+        with database.SessionLocal() as db:
+            self.assertTrue(leases.acquire(db, trash.LEASE, "a"))
+            self.assertTrue(leases.acquire(db, trash.LEASE, "a"))
+            self.assertFalse(leases.acquire(db, trash.LEASE, "b"))
+            db.query(models.Lease).update({models.Lease.expires_at: trash.PURGE_NOW})
+            db.commit()
+            self.assertTrue(leases.acquire(db, trash.LEASE, "b"))
+
+        self.client.delete(f"/delete/{self.name}", headers=self.alice)
+        self.assertEqual(trash.reap(retention=timedelta(0), rate=0, holder="a"), 0)
+        self.assertTrue(os.path.exists(storage.blob_path(self.name)))
+
+
+if __name__ == '__main__':
+    unittest.main()
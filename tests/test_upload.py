@@ -0,0 +1,76 @@
+import hashlib
+import os
+import sys
+import tempfile
+import unittest
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'desktop_client')))
+
+from api_client import MultipartFile
+from conftest import login
+
+
+class TestStreamingUpload(unittest.TestCase):
+
+    @pytest.fixture(autouse=True)
+    def _client(self, server_client):
+        self.client = server_client
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'звіт "1".bin')
+        self.content = os.urandom(3 * 1024 * 1024 + 17)
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+        self.headers = login(self.client, "alice")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_body(self, body, size):
+        chunks = []
+        while chunk := body.read(size):
+            self.assertLessEqual(len(chunk), size)
+            chunks.append(chunk)
+        body.close()
+        return b"".join(chunks)
+
+    def test_body_is_read_in_chunks(self):
+        "Тіло віддається шматками заданого розміру, а довжина відома до читання"
+        body = MultipartFile({"path": "/"}, "file", self.path)
+        length = len(body)
+        self.assertEqual(len(self.read_body(body, 64 * 1024)), length)
+
+    def test_digest_follows_file(self):
+        "Хеш рахується з надісланих шматків і йде окремим полем після файлу"
+        body = MultipartFile({"path": "/"}, "file", self.path)
+        data = self.read_body(body, 64 * 1024)
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(body.sha256.hexdigest(), digest)
+        self.assertLess(data.index(self.content), data.index(b'name="sha256"\r\n\r\n' + digest.encode()))
+
+    def test_server_accepts_body(self):
+        "Сервер розбирає потокове тіло і приймає хеш з поля після файлу"
+        body = MultipartFile({"path": "/docs/"}, "file", self.path)
+        r = self.client.post("/upload", content=self.read_body(body, 1024 * 1024),
+                             headers={**self.headers, "Content-Type": body.content_type})
+        self.assertEqual(r.status_code, 200)
+        f = self.client.get("/files", headers=self.headers).json()[0]
+        self.assertEqual((f["filename"], f["path"], f["sha256"]),
+                         ('звіт "1".bin', "/docs/", hashlib.sha256(self.content).hexdigest()))
+
+    def test_corrupted_body_rejected(self):
+        "Вміст пошкоджено дорогою - хеш не збігається, сервер відхиляє запис і нічого не зберігає"
+        body = MultipartFile({}, "file", self.path)
+        data = bytearray(self.read_body(body, 1024 * 1024))
+        start = data.index(self.content)
+        data[start] ^= 0xFF
+        r = self.client.post("/upload", content=bytes(data),
+                             headers={**self.headers, "Content-Type": body.content_type})
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(self.client.get("/files", headers=self.headers).json(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import hashlib
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'desktop_client')))
+
+from workers import SyncWorker, SyncQueue, WatchSyncWorker
+
+
+class TestSyncWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, "proj", "src"))
+        for rel in ["top.txt", os.path.join("proj", "a.py"), os.path.join("proj", "src", "b.py")]:
+            with open(os.path.join(self.tmp.name, rel), "w") as f:
+                f.write("x")
+
+        self.mock_api = MagicMock()
+        self.worker = SyncWorker(self.mock_api, self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def uploaded(self):
+        return sorted((call.args[1], os.path.basename(call.args[0])) for call in self.mock_api.upload_file.call_args_list)
+
+    def test_walks_subtrees(self):
+        "Файли з підпапок вивантажуються у відповідні папки на сервері"
+        self.mock_api.get_files.return_value = []
+        self.worker.run()
+        self.assertEqual(self.uploaded(), [("/", "top.txt"), ("/proj/", "a.py"), ("/proj/src/", "b.py")])
+
+    def test_skips_existing_in_same_folder(self):
+        "Існуючий файл пропускається тільки якщо він у тій самій папці"
+        self.mock_api.get_files.return_value = [
+            {'filename': 'a.py', 'path': '/proj/', 'access_type': 'owner'},
+            {'filename': 'b.py', 'path': '/', 'access_type': 'owner'},
+        ]
+        self.worker.run()
+        self.assertEqual(self.uploaded(), [("/", "top.txt"), ("/proj/src/", "b.py")])
+
+    def test_uploads_changed_content(self):
+        "Файл з іншим sha256 вивантажується повторно, однаковий - ні"
+        same = hashlib.sha256(b"x").hexdigest()
+        self.mock_api.get_files.return_value = [
+            {'filename': 'top.txt', 'path': '/', 'size': 1, 'sha256': same, 'access_type': 'owner'},
+            {'filename': 'a.py', 'path': '/proj/', 'size': 1, 'sha256': hashlib.sha256(b"y").hexdigest(),
+             'access_type': 'owner'},
+            {'filename': 'b.py', 'path': '/proj/src/', 'size': 5, 'sha256': same, 'access_type': 'owner'},
+        ]
+        self.worker.run()
+        self.assertEqual(self.uploaded(), [("/proj/", "a.py"), ("/proj/src/", "b.py")])
+
+    def test_ignores_shared_files(self):
+        "Чужий файл з тим самим шляхом, яким з нами поділились, не заважає вивантажити власний"
+        same = hashlib.sha256(b"x").hexdigest()
+        self.mock_api.get_files.return_value = [
+            {'filename': 'top.txt', 'path': '/', 'size': 1, 'sha256': same, 'access_type': 'read'},
+            {'filename': 'a.py', 'path': '/proj/', 'size': 1, 'sha256': same, 'access_type': 'write'},
+        ]
+        self.worker.run()
+        self.assertEqual(self.uploaded(), [("/", "top.txt"), ("/proj/", "a.py"), ("/proj/src/", "b.py")])
+
+
+class TestWatchSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmp.name, "watched")
+        os.makedirs(os.path.join(self.folder, "sub"))
+        self.queue_path = os.path.join(self.tmp.name, "queue.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_queue_coalesces_and_persists(self):
+        "Повторні події по одному шляху склеюються, черга переживає перевідкриття"
+        q = SyncQueue(self.queue_path)
+        for _ in range(5):
+            q.push("/x/a.txt", delay=0)
+        q.push("/x/b.txt", delay=60)
+        q.close()
+
+        q = SyncQueue(self.queue_path)
+        self.assertEqual(q.due(), ["/x/a.txt"])
+        q.done("/x/a.txt")
+        self.assertEqual(q.due(), [])
+        q.close()
+
+    def test_change_is_uploaded(self):
+        "Зміна файлу в підпапці вивантажується без ручного сканування"
+        api = MagicMock()
+        api.get_files.return_value = []
+        api.upload_file.return_value = True
+        worker = WatchSyncWorker(api, self.folder, self.queue_path)
+        worker.start()
+        try:
+            time.sleep(0.5)
+            path = os.path.join(self.folder, "sub", "new.txt")
+            for i in range(3):
+                with open(path, "w") as f:
+                    f.write(str(i))
+
+            deadline = time.time() + 5
+            while not api.upload_file.called and time.time() < deadline:
+                time.sleep(0.1)
+        finally:
+            worker.requestInterruption()
+            worker.wait()
+
+        api.upload_file.assert_called_once_with(path, "/sub/")
+
+
+if __name__ == '__main__':
+    unittest.main()